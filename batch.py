@@ -0,0 +1,72 @@
+import os
+import sys
+from itertools import repeat
+
+import exec_config
+
+# --- Batch recognition --- #
+"""
+recognizes many images in parallel worker processes, the number of workers,
+OpenCV threads per worker and cpu pinning all come from exec_config so
+parallel runs do not oversubscribe the cores
+"""
+
+# one detector per worker process so its buffers are reused across images
+_detector = None
+
+def _recognize_one(image_path, template_directory):
+    """runs in a worker process"""
+    global _detector
+    import plate_detect
+    import metrics
+    if _detector is None:
+        _detector = plate_detect.PlateDetector()
+    text = plate_detect.recognize_license_plate(image_path, template_directory, detector=_detector)
+    # pool workers are killed without atexit, so every task leaves the file up to date
+    metrics.write_textfile()
+    return text
+
+
+def recognize_batch(image_paths, template_directory="templates", config=None):
+    """yields (image_path, recognized text) for every image, in input order"""
+    image_paths = list(image_paths)
+    config = config or exec_config.get_config()
+
+    # a single worker does not need a pool, just limit OpenCV in this process
+    if config.workers <= 1 or len(image_paths) <= 1:
+        exec_config.apply(config)
+        for image_path in image_paths:
+            yield image_path, _recognize_one(image_path, template_directory)
+        return
+
+    metrics_file = os.environ.get("PLATE_METRICS_FILE")
+    if metrics_file and "{pid}" not in metrics_file:
+        # every worker and the parent would overwrite each other's counts
+        raise ValueError(f"PLATE_METRICS_FILE={metrics_file} is shared by {config.workers} workers, "
+                         "add {pid} to the path so each process writes its own file")
+
+    chunksize = max(1, len(image_paths) // (config.workers * 4))
+    with exec_config.make_process_pool(config) as pool:
+        results = pool.map(_recognize_one, image_paths, repeat(template_directory), chunksize=chunksize)
+        for image_path, text in zip(image_paths, results):
+            yield image_path, text
+
+
+# --- For running a batch from the terminal --- #
+if __name__ == "__main__":
+    # usage: python batch.py <image or directory> [...]
+    paths = []
+    for arg in sys.argv[1:] or ["test_images"]:
+        if os.path.isdir(arg):
+            paths.extend(os.path.join(arg, name) for name in sorted(os.listdir(arg))
+                         if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")))
+        else:
+            paths.append(arg)
+
+    import metrics
+    metrics.start_from_env()
+
+    config = exec_config.get_config()
+    print(f"Using {config}")
+    for image_path, text in recognize_batch(paths, config=config):
+        print(f"{image_path}: {text}")
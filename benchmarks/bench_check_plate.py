@@ -0,0 +1,199 @@
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import checkPlate
+from lto_stand_in import StandInLTO
+
+# --- check_plate load test --- #
+"""
+drives the real check_plate (headless Chrome through Selenium) at a fixed
+concurrency against the local LTO stand-in, or any --url, and reports the
+throughput, the latency percentiles and how much memory each worker's
+browser takes, to size browser pools and timeouts before real traffic does.
+Against the stand-in every answer is checked against its record, so failed
+searches (errors) and searches slower than check_plate waits (missed) show
+up separately from correct answers.
+
+usage: python benchmarks/bench_check_plate.py --requests 40 --concurrency 4 \
+           --latency 0.3 --jitter 0.1 --error-rate 0.05
+"""
+
+
+def random_plate(rng):
+    return "".join(rng.choices(string.ascii_uppercase, k=3)) + "".join(rng.choices(string.digits, k=4))
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * (len(ordered) - 1)))]
+
+
+# --- Browser memory --- #
+class BrowserMemory:
+    """
+    samples the resident memory of every process started by this one. Each
+    check_plate call starts a chromedriver with its own Chrome processes, the
+    tree under one chromedriver is one worker's browser. Reads /proc, so it
+    only measures on Linux
+    """
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.per_browser = []  # RSS in bytes of every browser tree seen in every sample
+        self.peak_total = 0
+        self.available = os.path.isdir("/proc")
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if self.available else 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="browser-memory", daemon=True)
+
+    def start(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _processes(self):
+        """{pid: (parent pid, rss bytes)} of every process we can read"""
+        processes = {}
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    # the command name may contain spaces, the fields after it do not
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{name}/statm") as f:
+                    resident = int(f.read().split()[1])
+            except (OSError, IndexError, ValueError):
+                continue  # the process exited while we were reading
+            processes[int(name)] = (int(fields[1]), resident * self._page_size)
+        return processes
+
+    def sample(self):
+        processes = self._processes()
+        children = {}
+        for pid, (ppid, _) in processes.items():
+            children.setdefault(ppid, []).append(pid)
+
+        total = 0
+        for root in children.get(os.getpid(), []):
+            tree_rss = 0
+            stack = [root]
+            while stack:
+                pid = stack.pop()
+                tree_rss += processes[pid][1]
+                stack.extend(children.get(pid, []))
+            self.per_browser.append(tree_rss)
+            total += tree_rss
+        self.peak_total = max(self.peak_total, total)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+
+# --- Running the load --- #
+OUTCOMES = ("correct", "missed", "wrong", "registered", "empty", "error")
+
+
+def classify(results, data, expected):
+    """
+    outcome of one lookup. With the stand-in's expected #result lines:
+    correct, missed (a record exists but none came back, e.g. the search
+    answered after check_plate stopped waiting) or wrong (other data than the
+    record). Without expectations (--url): registered or empty
+    """
+    if expected is None:
+        return "registered" if any(data.values()) else "empty"
+    if results == expected:
+        return "correct"
+    if expected and not results:
+        return "missed"
+    return "wrong"
+
+
+def run_load(url, requests, concurrency, timeout, seed=0, expect=None):
+    """runs the lookups, returns (wall seconds, [(seconds, outcome), ...]), expect(plate) gives the right answer"""
+    rng = random.Random(seed)
+    plates = [random_plate(rng) for _ in range(requests)]
+
+    def one(plate):
+        start = time.perf_counter()
+        try:
+            results, data = checkPlate.check_plate(plate, timeout=timeout, raise_errors=True, url=url)
+            outcome = classify(results, data, expect(plate) if expect else None)
+        except Exception:
+            outcome = "error"
+        return time.perf_counter() - start, outcome
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, plates))
+    return time.perf_counter() - start, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test check_plate against the local LTO stand-in")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10, help="check_plate time budget per lookup in seconds")
+    parser.add_argument("--url", help="test this URL instead of starting the stand-in")
+    parser.add_argument("--latency", type=float, default=0.3, help="stand-in search latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="stand-in latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stand-in searches that fail")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="stand-in page load delay in seconds")
+    args = parser.parse_args()
+
+    stand_in = None
+    url = args.url
+    if url is None:
+        stand_in = StandInLTO(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              page_latency=args.page_latency).start()
+        url = stand_in.url
+    print(f"{args.requests} lookups at concurrency {args.concurrency} against {url}")
+
+    memory = BrowserMemory().start()
+    try:
+        wall, samples = run_load(url, args.requests, args.concurrency, args.timeout,
+                                 expect=stand_in.record if stand_in is not None else None)
+    finally:
+        memory.stop()
+        if stand_in is not None:
+            stand_in.stop()
+
+    latencies = sorted(seconds for seconds, _ in samples)
+    outcomes = [outcome for _, outcome in samples]
+    print(f"\nthroughput   {len(samples) / wall:6.2f} req/s ({wall:.1f} s wall)")
+    print(f"latency      p50 {percentile(latencies, 50) * 1000:7.0f} ms   "
+          f"p95 {percentile(latencies, 95) * 1000:7.0f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.0f} ms   "
+          f"mean {statistics.mean(latencies) * 1000:7.0f} ms")
+    print("outcomes     " + ", ".join(f"{outcomes.count(name)} {name}" for name in OUTCOMES
+                                         if outcomes.count(name) or name in ("error", "correct")))
+    if stand_in is not None:
+        print(f"stand-in     {stand_in.searches} searches, {stand_in.errors} failed on purpose")
+
+    if memory.per_browser:
+        mb = 1024 * 1024
+        per_browser = sorted(memory.per_browser)
+        print(f"browser RSS  mean {statistics.mean(per_browser) / mb:6.0f} MB   "
+              f"p95 {percentile(per_browser, 95) / mb:6.0f} MB   max {per_browser[-1] / mb:6.0f} MB per worker, "
+              f"peak {memory.peak_total / mb:.0f} MB for all {args.concurrency}")
+    elif not memory.available:
+        print("browser RSS  not measured (needs /proc)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import plate_detect
+
+# --- Detector benchmark --- #
+"""
+per-frame detection latency on repeated same-sized frames, the one-off
+function path (new buffers every call) against a reused PlateDetector,
+serial and with parallel pyramid levels, plus the single-image latency of
+read_license_plate with and without parallel=True
+
+usage: python benchmarks/bench_detector.py [image_path] [frames]
+"""
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def report(label, samples):
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * (len(ordered) - 1)))]
+    print(f"{label:<22} mean {statistics.mean(samples) * 1000:7.2f} ms   "
+          f"stdev {statistics.stdev(samples) * 1000:6.2f} ms   p99 {p99 * 1000:7.2f} ms")
+
+
+def main():
+    image_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "test_images", "img1.jpg")
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    frame = plate_detect.load_image(image_path)
+    print(f"{frames} frames of {frame.shape[1]}x{frame.shape[0]}\n")
+
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        plate_detect.locate_plate(plate_detect.preprocess_image(frame))
+        samples.append(time.perf_counter() - start)
+    report("functions", samples)
+
+    detector = plate_detect.PlateDetector()
+    detector.detect(frame)  # first call allocates the buffers
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        detector.detect(frame)
+        samples.append(time.perf_counter() - start)
+    report("PlateDetector.detect", samples)
+
+    detector = plate_detect.PlateDetector(parallel=True)
+    detector.detect(frame)
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        detector.detect(frame)
+        samples.append(time.perf_counter() - start)
+    report("parallel detect", samples)
+
+    print()
+    templates = os.path.join(ROOT, "templates")
+    for parallel in (False, True):
+        plate_detect.read_license_plate(image_path, templates, parallel=parallel)  # loads the templates
+        samples = []
+        for _ in range(max(2, frames // 10)):
+            start = time.perf_counter()
+            plate_detect.read_license_plate(image_path, templates, parallel=parallel)
+            samples.append(time.perf_counter() - start)
+        report(f"read (parallel={parallel})", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import lookup_guard
+
+# --- Lookup guard load test against a simulated backend --- #
+"""
+drives a local stand-in for the LTO lookup (no browser, no network) with a
+heavy latency tail, random errors and an outage window, once with the old
+fixed timeout and once through lookup_guard.GuardedLookup, and prints the
+latency percentiles the caller sees.
+
+usage: python benchmarks/bench_lookup_guard.py [requests] [concurrency] [requests/sec]
+times are scaled down 10x so a run takes seconds (1.0 s here = 10 s real),
+requests arrive at a fixed rate like scans at a gate
+"""
+
+FIXED_TIMEOUT = 1.0
+
+
+class StandInBackend:
+    """median ~60 ms, 5% of requests stall for 1.5 s, 2% fail, and an outage from 40% to 55% of the run"""
+
+    def __init__(self, stall_rate=0.05, error_rate=0.02, outage=(0.40, 0.55)):
+        self.stall_rate = stall_rate
+        self.error_rate = error_rate
+        self.outage = outage
+        self.progress = 0.0  # set by the driver, 0..1 through the run
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    def __call__(self, plate_number, timeout):
+        with self._lock:
+            roll = self._random.random()
+            latency = self._random.lognormvariate(-2.8, 0.3)
+        if self.outage[0] <= self.progress < self.outage[1]:
+            time.sleep(min(timeout, 0.05))
+            raise RuntimeError("backend outage")
+        if roll < self.error_rate:
+            raise RuntimeError("backend error")
+        if roll < self.error_rate + self.stall_rate:
+            latency = 1.5
+        if latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("stand-in timed out")
+        time.sleep(latency)
+        return [], {"plate_number": plate_number}
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def drive(label, call, backend, requests, concurrency, rate):
+    latencies = []
+    outcomes = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+    run_start = time.monotonic()
+    duration = requests / rate
+
+    def one(i):
+        # wait for this request's arrival time
+        time.sleep(max(0.0, run_start + i / rate - time.monotonic()))
+        start = time.monotonic()
+        backend.progress = (start - run_start) / duration
+        try:
+            call(f"ABC{i:04d}")
+            outcome = "ok"
+        except Exception:
+            outcome = "failed"
+        with lock:
+            latencies.append(time.monotonic() - start)
+            outcomes[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.monotonic() - run_start
+
+    print(f"{label:<16} {requests / elapsed:7.1f} req/s   "
+          f"p50 {percentile(latencies, 50) * 1000:7.1f} ms   "
+          f"p95 {percentile(latencies, 95) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms   "
+          f"max {max(latencies) * 1000:7.1f} ms   ok {outcomes['ok']} failed {outcomes['failed']}")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+
+    executor = ThreadPoolExecutor(max_workers=concurrency * 2)
+
+    def fixed_timeout(backend):
+        def call(plate_number):
+            future = executor.submit(backend, plate_number, FIXED_TIMEOUT)
+            done, _ = wait([future], timeout=FIXED_TIMEOUT)
+            if not done:
+                raise TimeoutError("fixed timeout")
+            return future.result()
+        return call
+
+    print(f"{requests} requests at {rate:.0f}/s, concurrency {concurrency}\n")
+
+    backend = StandInBackend()
+    drive("fixed timeout", fixed_timeout(backend), backend, requests, concurrency, rate)
+
+    backend = StandInBackend()
+    guard = lookup_guard.GuardedLookup(backend, max_workers=concurrency * 2, default_timeout=FIXED_TIMEOUT,
+                                       min_timeout=0.1, max_timeout=3.0,
+                                       breaker=lookup_guard.CircuitBreaker(failure_threshold=5, reset_timeout=0.5))
+    drive("guarded", guard, backend, requests, concurrency, rate)
+    print(f"\nhedges sent {guard.hedges_sent}, won {guard.hedges_won}, breaker {guard.breaker.state}")
+
+    executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
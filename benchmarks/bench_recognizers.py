@@ -0,0 +1,132 @@
+import contextlib
+import csv
+import io
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import plate_detect
+import recognizers
+from train_classifier import build_samples
+
+# --- Recognizer benchmark --- #
+"""
+compares recognize_characters_template_matching with the recognizer backends
+on speed (per 7-character plate) and accuracy, twice:
+
+  synthetic - characters generated from the templates with a seed the
+              classifier was not trained on, the same generator it was
+              trained with, so this only shows the in-distribution fit
+  real      - characters segmented from the photos in test_images, labeled
+              by test_images/labels.csv
+
+usage: python benchmarks/bench_recognizers.py [samples_per_class]
+"""
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PLATE_LEN = 7
+LABELS = os.path.join(ROOT, "test_images", "labels.csv")
+
+
+def real_plates(labels_path=LABELS, max_contours=3):
+    """
+    [(segmented characters, plate text), ...] from the labeled photos. The
+    first crop (contour, plate size, threshold) that segments into as many
+    characters as the label has is used, photos where none does are left out
+    """
+    detector = plate_detect.PlateDetector()
+    with open(labels_path, newline="") as f:
+        labels = list(csv.DictReader(f))
+
+    found = []
+    for row in labels:
+        image = plate_detect.load_image(os.path.join(os.path.dirname(labels_path), row["image"]))
+        if image is None:
+            continue
+        truth = row["plate"]
+        with contextlib.redirect_stdout(io.StringIO()):  # the failed crops print their errors
+            for plate_contour in detector.candidates(image, max_contours):
+                chars = next((chars for plate_type in ("car", "motorcycle")
+                              for threshold in ("otsu", "otsu_equalized", "adaptive")
+                              for chars in [_segment(image, plate_contour, plate_type, threshold)]
+                              if chars is not None and len(chars) == len(truth)), None)
+                if chars is not None:
+                    found.append((chars, truth))
+                    break
+    return found
+
+
+def _segment(image, plate_contour, plate_type, threshold):
+    plate = plate_detect.crop_plate(image, plate_contour, plate_type)
+    if plate is None:
+        return None
+    return plate_detect.segment_characters(plate, threshold)[0]
+
+
+def plates(images, labels):
+    """groups the characters into plate-sized batches"""
+    for i in range(0, len(images), PLATE_LEN):
+        yield images[i:i + PLATE_LEN], labels[i:i + PLATE_LEN]
+
+
+def run(label, recognize, batches, show_misreads=False):
+    """recognize(chars) -> text over [(chars, truth), ...], prints ms per plate and accuracy"""
+    correct = 0
+    total = 0
+    misreads = Counter()
+    start = time.perf_counter()
+    for chars, truth in batches:
+        text = recognize(chars)
+        for predicted, expected in zip(text, truth):
+            if predicted == expected:
+                correct += 1
+            else:
+                misreads[f"{expected}->{predicted}"] += 1
+        total += len(truth)
+    elapsed = time.perf_counter() - start
+    line = f"{label:<40} {elapsed / len(batches) * 1000:8.2f} ms/plate   accuracy {correct / total * 100:6.1f}%"
+    if show_misreads and misreads:
+        line += "   misreads " + " ".join(f"{pair}" + (f" x{n}" if n > 1 else "")
+                                         for pair, n in misreads.most_common(6))
+    print(line)
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    templates = plate_detect.load_templates(os.path.join(ROOT, "templates"))
+    if not templates:
+        return
+
+    def legacy(chars):
+        with contextlib.redirect_stdout(io.StringIO()):  # it prints every plate it reads
+            return plate_detect.recognize_characters_template_matching(chars, templates)
+
+    backends = [("recognize_characters_template_matching", legacy)]
+    template_recognizer = recognizers.TemplateRecognizer(templates)
+    backends.append(("TemplateRecognizer", lambda chars: template_recognizer.recognize(chars)[0]))
+    try:
+        classifier = recognizers.FeatureRecognizer()
+        backends.append(("FeatureRecognizer", lambda chars: classifier.recognize(chars)[0]))
+    except FileNotFoundError as e:
+        print(f"FeatureRecognizer skipped: {e}")
+
+    images, labels = build_samples(templates, samples, seed=12345)
+    synthetic = list(plates(images, labels))
+    print(f"\nsynthetic: {len(images)} labeled characters, {len(synthetic)} plates\n")
+    for label, recognize in backends:
+        run(label, recognize, synthetic)
+
+    real = real_plates()
+    if not real:
+        print("\nreal: no labeled photo segmented, see test_images/labels.csv")
+        return
+    print(f"\nreal: {sum(len(truth) for _, truth in real)} labeled characters, {len(real)} plates "
+          f"(the photos that segment into as many characters as their label)\n")
+    for label, recognize in backends:
+        run(label, recognize, real, show_misreads=True)
+
+
+if __name__ == "__main__":
+    main()
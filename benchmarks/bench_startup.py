@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import time
+import statistics
+
+# --- Startup benchmark --- #
+"""
+measures cold start in fresh interpreters so nothing is cached between runs:
+  - import time of the library modules and of the GUI module
+  - time-to-first-window of ui/main.py
+  - time-to-first-result of plate_detect.recognize_license_plate
+
+usage: python benchmarks/bench_startup.py [runs] [image_path]
+"""
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+UI_DIR = os.path.join(ROOT, "ui")
+
+
+def time_process(args, cwd=ROOT, env=None, marker=None):
+    """runs a command and returns the seconds until it exits or prints the marker line"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+    elapsed = None
+    for line in proc.stdout:
+        if marker is not None and line.strip() == marker:
+            elapsed = time.perf_counter() - start
+            break
+    proc.wait()
+    if marker is not None:
+        return elapsed
+    if proc.returncode != 0:
+        return None
+    return time.perf_counter() - start
+
+
+def measure(label, args, runs, **kwargs):
+    """repeats a measurement and prints the median and the best run"""
+    samples = []
+    for _ in range(runs):
+        elapsed = time_process(args, **kwargs)
+        if elapsed is None:
+            print(f"{label:<32} failed (missing dependency?)")
+            return None
+        samples.append(elapsed)
+    print(f"{label:<32} median {statistics.median(samples) * 1000:8.1f} ms   best {min(samples) * 1000:8.1f} ms")
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    image_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT, "test_images", "img1.jpg")
+    python = sys.executable
+
+    print(f"Startup benchmark ({runs} runs each)\n")
+
+    baseline = measure("interpreter only", [python, "-c", "pass"], runs) or 0.0
+
+    print("\n-- import time --")
+    for module in ("plate_detect", "checkPlate", "plate_debug"):
+        measure(f"import {module}", [python, "-c", f"import {module}"], runs)
+    measure("import main_app (GUI)", [python, "-c", "import main_app"], runs, cwd=UI_DIR)
+
+    print("\n-- time to first window --")
+    env = dict(os.environ, PLATE_STARTUP_PROBE="1", PLATE_NO_PRELOAD="1")
+    measure("ui/main.py", [python, "main.py"], runs, cwd=UI_DIR, env=env, marker="window-shown")
+
+    print("\n-- time to first result --")
+    script = (
+        "import plate_detect; "
+        f"print(plate_detect.recognize_license_plate({image_path!r}, {os.path.join(ROOT, 'templates')!r}))"
+    )
+    measure("recognize_license_plate", [python, "-c", script], runs)
+
+    print(f"\n(interpreter startup of {baseline * 1000:.1f} ms is included in every number above)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# --- Local stand-in for the LTO lookup page --- #
+"""
+serves a page shaped like the LTO site as check_plate sees it: an outer page
+with an iframe whose src contains "npindex", and inside it a #search_text
+input that fills the #result list from a search request. The search answers
+after a configurable latency with jitter and fails at a configurable rate,
+a failed search shows its message in #search_error (check_plate raises on
+it), so lookups can be load tested without touching the real site.
+
+usage: python benchmarks/lto_stand_in.py [port] [latency] [jitter] [error_rate]
+then PLATE_LTO_URL=http://127.0.0.1:<port>/ points checkPlate at it
+"""
+
+OUTER_PAGE = """<!DOCTYPE html>
+<html><head><title>LTO stand-in</title></head>
+<body>
+<h1>Brand New Motor Vehicle and Motorcycle</h1>
+<iframe src="/npindex.html" width="800" height="600"></iframe>
+</body></html>
+"""
+
+# vanilla JS, the stand-in has no network access for jQuery. Searches are
+# debounced like the real page so typing a plate sends one request
+INNER_PAGE = """<!DOCTYPE html>
+<html><head><title>npindex</title></head>
+<body>
+<input type="text" id="search_text" placeholder="Plate number">
+<ul id="result"></ul>
+<div id="search_error"></div>
+<script>
+var box = document.getElementById("search_text");
+var list = document.getElementById("result");
+var error = document.getElementById("search_error");
+var pending = null;
+function search() {
+    var plate = box.value.trim();
+    error.textContent = "";
+    if (!plate) { list.innerHTML = ""; return; }
+    fetch("/search?plate=" + encodeURIComponent(plate))
+        .then(function (r) { if (!r.ok) { throw new Error(r.status); } return r.json(); })
+        .then(function (lines) {
+            list.innerHTML = "";
+            lines.forEach(function (line) {
+                var li = document.createElement("li");
+                li.textContent = line;
+                list.appendChild(li);
+            });
+        })
+        .catch(function (e) { list.innerHTML = ""; error.textContent = "Search failed (" + e.message + ")"; });
+}
+function schedule() { clearTimeout(pending); pending = setTimeout(search, 200); }
+box.addEventListener("keyup", schedule);
+box.addEventListener("change", schedule);
+</script>
+</body></html>
+"""
+
+OFFICES = ("NCR - Quezon City", "NCR - Manila", "NCR - Pasig", "NCR - Makati")
+CLASSIFICATIONS = ("Private", "For Hire", "Motorcycle")
+
+
+class StandInLTO:
+    """
+    the stand-in server. latency and jitter (seconds) shape the search
+    response time, normally distributed and never negative, error_rate is
+    the share of searches answered with a 500, page_latency delays the page
+    loads and registered_rate is the share of plates that have a record
+    (decided by the plate text, so the same plate always gets the same answer)
+    """
+
+    def __init__(self, port=0, latency=0.3, jitter=0.1, error_rate=0.0, page_latency=0.0,
+                 registered_rate=0.7, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.page_latency = page_latency
+        self.registered_rate = registered_rate
+        self.searches = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="lto-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def record(self, plate):
+        """the #result lines for a plate, empty when it is not registered"""
+        digest = zlib.crc32(plate.encode("utf-8"))
+        if digest % 1000 >= self.registered_rate * 1000:
+            return []
+        return [
+            f"Plate Number: {plate}",
+            f"MV Classification: {CLASSIFICATIONS[digest % len(CLASSIFICATIONS)]}",
+            f"LTO NRU Office: {OFFICES[(digest >> 4) % len(OFFICES)]}",
+            f"Released To: Dealer {digest % 97:02d}",
+            f"Date Released: 2024-{digest % 12 + 1:02d}-{digest % 28 + 1:02d}",
+        ]
+
+    def _search_delay(self):
+        """(seconds to wait, whether to fail) for one search"""
+        with self._lock:
+            self.searches += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body, content_type):
+                body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                request = urlparse(self.path)
+                if request.path in ("/", "/index.html"):
+                    time.sleep(stand_in.page_latency)
+                    self._send(200, OUTER_PAGE, "text/html; charset=utf-8")
+                elif request.path == "/npindex.html":
+                    time.sleep(stand_in.page_latency)
+                    self._send(200, INNER_PAGE, "text/html; charset=utf-8")
+                elif request.path == "/search":
+                    plate = parse_qs(request.query).get("plate", [""])[0].strip().upper()
+                    delay, failed = stand_in._search_delay()
+                    time.sleep(delay)
+                    if failed:
+                        self._send(500, "[]", "application/json")
+                    else:
+                        self._send(200, json.dumps(stand_in.record(plate)), "application/json")
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass  # one line per request would flood a load test
+
+        return Handler
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    jitter = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    error_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    stand_in = StandInLTO(port, latency, jitter, error_rate).start()
+    print(f"Serving the LTO stand-in on {stand_in.url} (latency {latency}s, jitter {jitter}s, "
+          f"errors {error_rate:.0%}), Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stand_in.stop()
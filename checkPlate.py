@@ -1,11 +1,28 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+import os
+import threading
 import time
 
-def check_plate(plate_number: str) -> tuple[list[str], dict]:
+import metrics
+
+# selenium is imported inside check_plate, importing it at module load
+# made the GUI and every batch worker pay for it even before the first lookup
+
+# PLATE_LTO_URL points the lookups somewhere else, e.g. the local stand-in
+# of benchmarks/lto_stand_in.py for load tests
+LTO_URL = os.environ.get("PLATE_LTO_URL", "https://www.ltoncr.com/brand-new-motor-vehicle-and-motorcycle/")
+
+def check_plate(plate_number: str, timeout: float = 10, raise_errors: bool = False,
+                url: str = None) -> tuple[list[str], dict]:
+    # timeout is the budget for the whole lookup (browser start, page load,
+    # waits and the fixed delays together) so a stalled site cannot hold a
+    # browser for longer, raise_errors lets lookup_guard tell a failed lookup
+    # apart from a plate with no results, url defaults to LTO_URL
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+
     # initialize arrays and formatting
     results = []
     data = {
@@ -16,25 +33,44 @@ def check_plate(plate_number: str) -> tuple[list[str], dict]:
         'date_released': ''
     }
     
+    deadline = time.monotonic() + timeout
+
+    def remaining():
+        """seconds left of the budget, raises once it is used up"""
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"lookup took longer than {timeout:.1f} s")
+        return left
+
     # Selenium flags
     options = Options()
     options.add_argument('--headless')  # headless mode para di na lumabas yung browser
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
     
+    # no browser for a lookup whose budget is already gone
+    try:
+        remaining()
+    except TimeoutError as e:
+        print(f"An error occurred: {e}")
+        if raise_errors:
+            raise
+        return results, data
+
     # initialize driver
     driver = webdriver.Chrome(options=options)
     
     # try-except for crash prevention
     try:
+        driver.set_page_load_timeout(remaining())
         # link to LTO site
-        driver.get("https://www.ltoncr.com/brand-new-motor-vehicle-and-motorcycle/")
+        driver.get(url or LTO_URL)
         
         # since the relevant section is embedded inside the website
         # we usde iframes to trigger and "wait" for it
         print("debug: Looking for iframe...")
         try:
-            iframe = WebDriverWait(driver, 10).until(
+            iframe = WebDriverWait(driver, remaining()).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "iframe[src*='npindex']"))
             )
             print("debug: Found iframe, switching to it...")
@@ -46,12 +82,12 @@ def check_plate(plate_number: str) -> tuple[list[str], dict]:
         # find the textbox
         # search_text siya sa html
         # then input the plate number
-        input_box = WebDriverWait(driver, 10).until(
+        input_box = WebDriverWait(driver, remaining()).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, "#search_text"))
         )
         input_box.clear()
         input_box.send_keys(plate_number.strip())
-        time.sleep(1)
+        time.sleep(min(1, remaining()))
                
         # from stack overflow
         # trigger event para sa site
@@ -65,8 +101,14 @@ def check_plate(plate_number: str) -> tuple[list[str], dict]:
         
         # kailangan ng delay for update sa site
         # i-aadjust ata to based sa internet speed
-        time.sleep(1.5)
+        time.sleep(min(1.5, remaining()))
         
+        # a message in #search_error means the search failed, not that the plate has no record
+        # (the local stand-in of benchmarks/lto_stand_in.py shows one)
+        errors = [e.text.strip() for e in driver.find_elements(By.CSS_SELECTOR, "#search_error") if e.text.strip()]
+        if errors:
+            raise RuntimeError(f"search failed on the site: {errors[0]}")
+
         # results based sa list element sa html 
         items = driver.find_elements(By.CSS_SELECTOR, "#result li")
         print(f"Found {len(items)} results")
@@ -93,6 +135,8 @@ def check_plate(plate_number: str) -> tuple[list[str], dict]:
                 
     except Exception as e:
         print(f"An error occurred: {e}")
+        if raise_errors:
+            raise
     finally:
         driver.quit()
     
@@ -100,6 +144,114 @@ def check_plate(plate_number: str) -> tuple[list[str], dict]:
     # data is the "programmatically readable" format
     return results, data
 
+# --- Tiered lookup: local registry first, then the LTO site --- #
+# how far the best wildcard match must score ahead of the next one at the
+# "?" positions to count as registered
+INFERRED_MIN_MARGIN = float(os.environ.get("PLATE_INFERRED_MIN_MARGIN", "0.15"))
+
+def lookup_plate(plate_number: str, candidates=None, registry_db=None) -> dict:
+    """
+    checks the local registry snapshot before going to the network.
+    Plates with unknown characters ("?") are only resolved locally, sending
+    them to the site is pointless. candidates are the recognizer's
+    per-character scores, used to rank wildcard matches.
+
+    returns a dict with results, data (same as check_plate), status
+    ("registered", "not_registered", "unresolved", "registered_inferred" when
+    unknown characters were filled in by a guess the recognizer does not back,
+    see _guess_is_backed, or "unavailable" when the site is failing and
+    verification could not be done), source ("registry" or
+    "network"), matches (other registry plates that fit the pattern) and
+    seconds (how long the lookup took)
+    """
+    start = time.perf_counter()
+    lookup = _lookup_plate(plate_number, candidates, registry_db)
+    lookup["seconds"] = time.perf_counter() - start
+
+    metrics.LOOKUP_SECONDS.observe(lookup["seconds"], source=lookup["source"])
+    metrics.LOOKUPS.inc(status=lookup["status"], source=lookup["source"])
+    return lookup
+
+def _lookup_plate(plate_number, candidates, registry_db):
+    """the actual lookup, lookup_plate adds timing and metrics"""
+    import registry
+
+    lookup = {"results": [], "data": None, "status": "not_registered", "source": "registry", "matches": []}
+
+    local = registry.get_registry(registry_db) if registry_db else registry.get_registry()
+    if local is not None:
+        matches = local.lookup(plate_number, candidates)
+        metrics.LOOKUP_CACHE.inc(result="hit" if matches else "miss")
+        if matches:
+            data = dict(matches[0][0])
+            status = "registered"
+            if "?" in plate_number and not _guess_is_backed(registry.normalize_plate(plate_number),
+                                                             candidates, matches):
+                status = "registered_inferred"
+            lookup.update(results=registry.to_results(data), data=data, status=status,
+                          matches=[m[0]["plate_number"] for m in matches])
+            return lookup
+
+    if "?" in plate_number:
+        lookup["status"] = "unresolved"
+        return lookup
+
+    import lookup_guard
+    try:
+        results, data = get_lookup_guard()(plate_number)
+    except lookup_guard.VerificationUnavailable as e:
+        print(f"Error checking plate registration: {e}")
+        lookup.update(status="unavailable", source="network")
+        return lookup
+
+    lookup.update(results=results, data=data, source="network")
+    if data and any(data.values()):
+        lookup["status"] = "registered"
+    return lookup
+
+def _guess_is_backed(pattern, candidates, matches):
+    """
+    True when the recognizer backs the best match at the "?" positions: its
+    score for the filled-in character is above the recognizer's cut-off at
+    every one of them and, when other plates fit too, ahead of the next match
+    by INFERRED_MIN_MARGIN on average. The known characters are the same for
+    every match, so they say nothing about the guess and are left out
+    """
+    from recognizers import Recognizer
+
+    if not candidates or len(candidates) != len(pattern):
+        return False
+    unknown = [index for index, char in enumerate(pattern) if char == "?"]
+    scores = [dict(candidates[index]) for index in unknown]
+
+    def guessed(plate):
+        return [position.get(plate[index], 0.0) for index, position in zip(unknown, scores)]
+
+    best = guessed(matches[0][0]["plate_number"])
+    if min(best) <= Recognizer.min_score:
+        return False
+    if len(matches) > 1:
+        runner_up = guessed(matches[1][0]["plate_number"])
+        if (sum(best) - sum(runner_up)) / len(unknown) < INFERRED_MIN_MARGIN:
+            return False
+    return True
+
+# --- Shared guard for the network lookups --- #
+_guard = None
+_guard_lock = threading.Lock()
+
+def get_lookup_guard():
+    """adaptive timeouts, hedging and circuit breaking around check_plate (see lookup_guard.py)"""
+    global _guard
+    # the pipeline looks plates up from several threads, they must share one guard
+    with _guard_lock:
+        if _guard is None:
+            import lookup_guard
+            _guard = lookup_guard.GuardedLookup(
+                lambda plate, timeout: check_plate(plate, timeout=timeout, raise_errors=True)
+            )
+        return _guard
+
 # if irrun galing sa terminal
 # if __name__ == "__main__":
 #     plate = input("Enter plate number: ")
@@ -0,0 +1,259 @@
+import itertools
+import os
+import re
+import threading
+import time
+import weakref
+
+import cv2
+import numpy as np
+
+import metrics
+import plate_detect
+
+# --- Escalation ladder --- #
+"""
+reads a plate cheaply first and only spends more when the read is not
+good enough. Every rung crops, segments and recognizes one more way and the
+ladder stops at the first confident read:
+
+  fast               - plate found on a copy scaled down to work_width
+  full_resolution    - plate found on the full frame
+  motorcycle         - same plate warped to 235x135 instead of 390x140
+  otsu_equalized,
+  adaptive           - other thresholds (see plate_detect.threshold_plate)
+  contour1, ...      - the next plate-shaped contours, car and motorcycle
+
+a read is confident when no character is "?", every character scores at
+least min_char_score and the text looks like a Philippine plate. When no
+rung gets there the best plate-shaped read is returned, with at most
+MAX_UNKNOWN "?" for the registry to fill in. A read that no rung gets into
+plate shape is a failure ("No confident read"), fragments are not passed
+on as plate text. Most images stop at the fast rung, so the average cost
+stays close to a single low resolution pass.
+
+with debugging on, each rung's threshold and characters are written under
+<image>_<rung>_..., the chosen contour and plate as <image>_accepted_<rung>_...
+"""
+
+# characters only, the segmentation drops the spaces and dashes
+PLATE_FORMATS = (
+    r"[A-Z]{3}\d{3,4}",  # cars, ABC 1234 and the older ABC 123
+    r"[A-Z]{2}\d{4,5}",  # motorcycles, AB 12345
+    r"\d{3}[A-Z]{3}",    # motorcycles, 123 ABC
+    r"\d{4}[A-Z]{2}",    # older motorcycles, 1234 AB
+)
+
+# "?" a plate-shaped read may still have, the registry refuses patterns with more
+MAX_UNKNOWN = 2
+
+DEFAULT_MIN_CHAR_SCORE = float(os.environ.get("PLATE_MIN_CHAR_SCORE", "0.55"))
+
+
+def matches_format(text, formats=PLATE_FORMATS, max_unknown=0):
+    """True when the text is one of the plate formats, up to max_unknown "?" stand for any character"""
+    unknown = text.count("?")
+    if unknown > max_unknown:
+        return False
+    template = text.replace("?", "{}")
+    # every "?" is either a letter or a digit in the formats
+    return any(re.fullmatch(pattern, template.format(*fill))
+               for fill in itertools.product("A0", repeat=unknown) for pattern in formats)
+
+
+def read_quality(text, candidates, min_char_score=DEFAULT_MIN_CHAR_SCORE, formats=PLATE_FORMATS):
+    """
+    returns (confident, rank) for a read, rank orders unconfident reads:
+    plate-shaped (counting up to MAX_UNKNOWN "?") first, then fewer "?",
+    then the higher average score. rank[0] is False for fragments
+    """
+    if not text:
+        return False, (False, float("-inf"), float("-inf"))
+    scores = [c[0][1] if c else 0.0 for c in candidates]
+    plate_shaped = matches_format(text, formats, MAX_UNKNOWN)
+    confident = plate_shaped and "?" not in text and min(scores) >= min_char_score
+    return confident, (plate_shaped, -text.count("?"), sum(scores) / len(scores))
+
+
+class EscalatingReader:
+    """
+    runs the ladder on a decoded image. Holds a low resolution and a full
+    resolution PlateDetector so their buffers are reused, detector replaces
+    the full resolution one and its camera profile (unless one is given)
+    steers the fast rung. Keep the reader around between images (see
+    get_reader), not thread-safe, use one reader per thread
+    """
+
+    def __init__(self, camera_profile=None, detector=None, parallel=False, work_width=640, max_contours=3,
+                 min_char_score=DEFAULT_MIN_CHAR_SCORE, formats=PLATE_FORMATS):
+        if camera_profile is None and detector is not None:
+            camera_profile = detector.camera_profile
+        # the ROI prior works on normalized coordinates, so it applies at the working resolution too
+        self.fast_detector = plate_detect.PlateDetector(camera_profile, parallel=parallel)
+        self.full_detector = detector or plate_detect.PlateDetector(parallel=parallel)
+        self.parallel = parallel
+        self.work_width = work_width
+        self.max_contours = max_contours
+        self.min_char_score = min_char_score
+        self.formats = formats
+
+    # --- Finding plates --- #
+    def fast_contour(self, result, image):
+        """the plate contour found on the working resolution copy, in image coordinates"""
+        stage_start = time.perf_counter()
+        height, width = image.shape[:2]
+        if width > self.work_width:
+            scale = width / float(self.work_width)
+            small = cv2.resize(image, (self.work_width, int(round(height / scale))), interpolation=cv2.INTER_AREA)
+            plate_contour = self.fast_detector.detect(small)
+            if plate_contour is not None:
+                plate_contour = np.round(plate_contour * np.array([width / small.shape[1], height / small.shape[0]])
+                                         ).astype(np.int32)
+        else:
+            plate_contour = self.fast_detector.detect(image)
+        plate_detect._stage_done(result["timings"], "detect", stage_start)
+        return plate_contour
+
+    def _full_contours(self, result, image):
+        stage_start = time.perf_counter()
+        contours = self.full_detector.candidates(image, self.max_contours)
+        plate_detect._stage_done(result["timings"], "detect", stage_start)
+        return contours
+
+    # --- The ladder --- #
+    def _rungs(self, result, image, fast):
+        """yields (rung, contour, plate type, threshold), finding contours only when they are needed"""
+        if fast is not None:
+            yield "fast", fast, "car", "otsu"
+
+        contours = self._full_contours(result, image)
+        if fast is not None and not any(plate_detect._same_region(fast, c) for c in contours):
+            # keep the fast plate for the retries when the full frame finds other shapes
+            contours.insert(0, fast)
+        if not contours:
+            return
+        first = contours[0]
+
+        yield "full_resolution", first, "car", "otsu"
+        yield "motorcycle", first, "motorcycle", "otsu"
+        for threshold in ("otsu_equalized", "adaptive"):
+            yield threshold, first, None, threshold  # None: the plate type that read best so far
+        for index, plate_contour in enumerate(contours[1:], 1):
+            yield f"contour{index}", plate_contour, "car", "otsu"
+            yield f"contour{index}_motorcycle", plate_contour, "motorcycle", "otsu"
+
+    def _attempt(self, result, image, plate_contour, plate_type, threshold, recognizer):
+        """one crop, segment and recognize pass, returns (text, candidates) or None"""
+        timings = result["timings"]
+        stage_start = time.perf_counter()
+        plate = plate_detect.crop_plate(image, plate_contour, plate_type)
+        plate_detect._stage_done(timings, "crop", stage_start)
+        if plate is None:
+            return None
+
+        stage_start = time.perf_counter()
+        segmented_chars, _, _ = plate_detect.segment_characters(plate, threshold)
+        plate_detect._stage_done(timings, "segment", stage_start)
+        if segmented_chars is None:
+            return None
+
+        stage_start = time.perf_counter()
+        read = recognizer.recognize(segmented_chars)
+        plate_detect._stage_done(timings, "match", stage_start)
+        return read
+
+    def read(self, result, image, recognizer=None, template_directory="templates", fast_contour=False):
+        """
+        fills in result (see plate_detect.read_license_plate) for a decoded
+        image. fast_contour can be passed when it was already found (the
+        pipeline detects it in its own stage), False finds it here
+        """
+        recognizer = plate_detect._resolve_recognizer(result, recognizer, template_directory, self.parallel)
+        if recognizer is None:
+            return result
+        if fast_contour is False:
+            fast_contour = self.fast_contour(result, image)
+
+        attempts = result["attempts"] = []
+        base_prefix = plate_detect._debug_prefix.get()
+        best = None  # (rank, rung, text, candidates, contour, plate type)
+        tried = set()
+        found_plate = False
+        for rung, plate_contour, plate_type, threshold in self._rungs(result, image, fast_contour):
+            found_plate = True
+            plate_type = plate_type or (best[5] if best is not None else "car")
+            key = (plate_contour.tobytes(), plate_type, threshold)
+            if key in tried:
+                continue
+            tried.add(key)
+
+            attempts.append(rung)
+            # every rung writes its own debug artifacts (<image>_<rung>_thresh, ..._char00, ...)
+            token = plate_detect._debug_prefix.set(f"{base_prefix}_{rung}") if plate_detect._debug else None
+            try:
+                read = self._attempt(result, image, plate_contour, plate_type, threshold, recognizer)
+            finally:
+                if token is not None:
+                    plate_detect._debug_prefix.reset(token)
+            if read is None:
+                continue
+            text, candidates = read
+            confident, rank = read_quality(text, candidates, self.min_char_score, self.formats)
+            if best is None or rank > best[0]:
+                best = (rank, rung, text, candidates, plate_contour, plate_type)
+            if confident:
+                break
+        else:
+            confident = False
+
+        if best is None:
+            metrics.ESCALATIONS.inc(rung="none", confident="false")
+            if not found_plate:
+                return plate_detect._fail(result, "License plate contour not found", "contour_not_found")
+            return plate_detect._fail(result, "No characters segmented", "no_characters")
+        if not best[0][0]:
+            # only fragments, a lookup or the GUI cannot do anything useful with them
+            metrics.ESCALATIONS.inc(rung="none", confident="false")
+            return plate_detect._fail(result, "No confident read", "no_confident_read")
+
+        _, rung, result["text"], result["candidates"], plate_contour, plate_type = best
+        result["rung"] = rung
+        result["confident"] = confident
+        metrics.ESCALATIONS.inc(rung=rung, confident=str(confident).lower())
+        metrics.UNKNOWN_CHARACTERS.inc(result["text"].count("?"))
+
+        if plate_detect._debug is not None:
+            # the accepted read, named after the rung whose artifacts explain it
+            import plate_debug
+            plate_detect._capture(f"accepted_{rung}_contour", plate_debug.render_contour, image, plate_contour)
+            plate_detect._capture(f"accepted_{rung}_plate", None, plate_detect.crop_plate(image, plate_contour, plate_type))
+        return result
+
+
+# --- Reusing readers --- #
+_by_detector = weakref.WeakKeyDictionary()
+_by_detector_lock = threading.Lock()
+_local = threading.local()
+
+def get_reader(camera_profile=None, detector=None, parallel=False):
+    """
+    a cached reader so the detector buffers survive between images: one per
+    detector passed in (detectors already belong to one thread), otherwise one
+    per thread and camera profile
+    """
+    if detector is not None:
+        with _by_detector_lock:
+            reader = _by_detector.get(detector)
+            if reader is None:
+                reader = _by_detector[detector] = EscalatingReader(camera_profile, detector=detector,
+                                                                   parallel=parallel)
+            return reader
+
+    if not hasattr(_local, "by_profile"):
+        _local.by_profile = weakref.WeakKeyDictionary()
+        _local.plain = {}
+    readers = _local.plain if camera_profile is None else _local.by_profile.setdefault(camera_profile, {})
+    reader = readers.get(parallel)
+    if reader is None:
+        reader = readers[parallel] = EscalatingReader(camera_profile, parallel=parallel)
+    return reader
@@ -0,0 +1,257 @@
+import os
+import threading
+import time
+
+# --- Execution configuration --- #
+"""
+one place that decides how the cores are shared between OpenCV's internal
+thread pool (bilateralFilter, GaussianBlur, warpPerspective, ...) and our own
+worker processes. Without it every worker starts an OpenCV pool as big as the
+machine and parallel runs oversubscribe the cores.
+
+profiles:
+  "auto"       - calibrates OpenCV threading on this machine and splits the
+                 cores between threads per image and images in parallel
+  "latency"    - one worker, the pyramid levels and characters of one image
+                 are spread over a thread pool of up to PARALLEL_POOL
+                 threads and OpenCV gets the cores left per pool thread
+                 (GUI, single image)
+  "throughput" - one single-threaded worker per core (big batches)
+
+the environment can override the profile:
+  PLATE_EXEC_PROFILE, PLATE_CV_THREADS, PLATE_WORKERS, PLATE_PIN_AFFINITY=1,
+  PLATE_PARALLEL=0/1
+"""
+
+PROFILES = ("auto", "latency", "throughput")
+
+# most pool threads the latency profile spreads one image over
+PARALLEL_POOL = 4
+
+
+class ExecutionConfig:
+    """
+    how many OpenCV threads each worker uses, how many workers run, whether
+    they are pinned and whether one image is processed with threads (parallel)
+    """
+
+    def __init__(self, cv_threads=1, workers=1, pin_affinity=False, profile="custom", parallel=False):
+        self.cv_threads = max(1, int(cv_threads))
+        self.workers = max(1, int(workers))
+        self.pin_affinity = bool(pin_affinity)
+        self.profile = profile
+        self.parallel = bool(parallel)
+
+    def __repr__(self):
+        return (f"ExecutionConfig(profile={self.profile!r}, cv_threads={self.cv_threads}, "
+                f"workers={self.workers}, pin_affinity={self.pin_affinity}, parallel={self.parallel})")
+
+
+_config = None
+
+
+# --- Looking at the machine --- #
+def available_cpus():
+    """sorted list of the cpus this process may run on (respects taskset and cgroups)"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def calibrate(max_threads=None, size=(1280, 720), repeats=3):
+    """times the preprocessing filters with different OpenCV thread counts, returns {threads: seconds per frame}"""
+    import cv2
+    import numpy as np
+
+    max_threads = max_threads or len(available_cpus())
+    width, height = size
+    frame = np.random.default_rng(0).integers(0, 256, (height, width), dtype=np.uint8)
+
+    candidates = [1]
+    while candidates[-1] * 2 <= max_threads:
+        candidates.append(candidates[-1] * 2)
+    if candidates[-1] != max_threads:
+        candidates.append(max_threads)
+
+    previous = cv2.getNumThreads()
+    timings = {}
+    try:
+        for threads in candidates:
+            cv2.setNumThreads(threads)
+            cv2.bilateralFilter(frame, 11, 17, 17)  # warm up the thread pool
+            start = time.perf_counter()
+            for _ in range(repeats):
+                filtered = cv2.bilateralFilter(frame, 11, 17, 17)
+                blurred = cv2.GaussianBlur(filtered, (7, 7), 0)
+                cv2.Canny(blurred, 50, 200)
+            timings[threads] = (time.perf_counter() - start) / repeats
+    finally:
+        cv2.setNumThreads(previous)
+    return timings
+
+
+# --- Building the profiles --- #
+def auto_profile(run_calibration=True, min_efficiency=0.8):
+    """
+    picks the split between intra-op threads and parallel images
+
+    images are independent so running them side by side scales almost
+    perfectly, OpenCV threads only get cores when the calibration shows they
+    are nearly as efficient (speedup / threads >= min_efficiency)
+    """
+    cores = len(available_cpus())
+    cv_threads = 1
+    if cores > 1 and run_calibration:
+        try:
+            timings = calibrate(cores)
+            single = timings[1]
+            for threads, seconds in sorted(timings.items()):
+                if threads > 1 and single / (seconds * threads) >= min_efficiency:
+                    cv_threads = threads
+        except Exception as e:
+            print(f"Error during calibration, falling back to one thread per worker: {e}")
+            cv_threads = 1
+    return ExecutionConfig(cv_threads, max(1, cores // cv_threads), profile="auto")
+
+
+def make_profile(profile="auto"):
+    """builds one of the named profiles"""
+    cores = len(available_cpus())
+    if profile == "latency":
+        if cores == 1:
+            return ExecutionConfig(1, 1, profile=profile)
+        # pool threads times OpenCV threads stays within the cores
+        pool = min(PARALLEL_POOL, cores)
+        return ExecutionConfig(max(1, cores // pool), 1, profile=profile, parallel=True)
+    if profile == "throughput":
+        return ExecutionConfig(1, cores, profile=profile)
+    if profile == "auto":
+        return auto_profile()
+    raise ValueError(f"Unknown execution profile: {profile} (expected one of {PROFILES})")
+
+
+def configure(profile=None, cv_threads=None, workers=None, pin_affinity=None, parallel=None):
+    """sets the process-wide execution config, explicit arguments win over the environment"""
+    global _config
+
+    profile = profile or os.environ.get("PLATE_EXEC_PROFILE", "auto")
+    config = make_profile(profile)
+
+    cv_threads = cv_threads or os.environ.get("PLATE_CV_THREADS")
+    workers = workers or os.environ.get("PLATE_WORKERS")
+    if pin_affinity is None:
+        pin_affinity = os.environ.get("PLATE_PIN_AFFINITY", "") not in ("", "0")
+
+    if cv_threads:
+        config.cv_threads = max(1, int(cv_threads))
+    if workers:
+        config.workers = max(1, int(workers))
+    config.pin_affinity = bool(pin_affinity)
+    if parallel is None and os.environ.get("PLATE_PARALLEL"):
+        parallel = os.environ["PLATE_PARALLEL"] not in ("", "0")
+    if parallel is not None:
+        config.parallel = bool(parallel)
+
+    _config = config
+    return config
+
+
+def get_config():
+    """returns the current config, configuring from the environment on first use"""
+    if _config is None:
+        return configure()
+    return _config
+
+
+# --- Applying the config --- #
+def apply(config=None):
+    """applies the OpenCV thread count to the current process (GUI or a single-process run)"""
+    import cv2
+
+    config = config or get_config()
+    cv2.setNumThreads(config.cv_threads)
+    return config
+
+
+_thread_pool = None
+_thread_pool_size = 0
+_thread_pool_lock = threading.Lock()
+
+def pool_threads(config=None):
+    """
+    threads for the work inside one image: the cores of one worker divided by
+    the OpenCV threads each of them starts, so pool threads times OpenCV
+    threads do not add up to more than the cores
+    """
+    config = config or get_config()
+    cores_per_worker = max(1, len(available_cpus()) // config.workers)
+    return max(1, cores_per_worker // config.cv_threads)
+
+
+def thread_pool():
+    """
+    shared thread pool for work inside one image (pyramid levels, characters).
+    OpenCV releases the GIL so threads are enough. Sized by pool_threads() of
+    the current config and rebuilt when a new config changes the size
+    """
+    global _thread_pool, _thread_pool_size
+    with _thread_pool_lock:
+        size = pool_threads()
+        if _thread_pool is None or size != _thread_pool_size:
+            from concurrent.futures import ThreadPoolExecutor
+            if _thread_pool is not None:
+                _thread_pool.shutdown(wait=False)  # tasks already submitted still run
+            _thread_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="plate")
+            _thread_pool_size = size
+        return _thread_pool
+
+
+def cpu_sets(config=None):
+    """splits the available cpus into one set per worker, each as big as the OpenCV thread count"""
+    config = config or get_config()
+    cpus = available_cpus()
+    sets = []
+    for i in range(config.workers):
+        chunk = cpus[(i * config.cv_threads) % len(cpus):][:config.cv_threads]
+        sets.append(chunk or cpus)
+    return sets
+
+
+def _init_worker(cv_threads, cpu_queue):
+    """process pool initializer: limits OpenCV threads and optionally pins the worker to its cpus"""
+    import cv2
+
+    cv2.setNumThreads(cv_threads)
+    if cpu_queue is None:
+        return
+    try:
+        cpus = cpu_queue.get(timeout=1)
+        os.sched_setaffinity(0, cpus)
+    except Exception as e:
+        print(f"Error pinning worker {os.getpid()}: {e}")
+
+
+def make_process_pool(config=None):
+    """creates a process pool whose workers follow the execution config"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    config = config or get_config()
+    cpu_queue = None
+    if config.pin_affinity and hasattr(os, "sched_setaffinity"):
+        cpu_queue = multiprocessing.Queue()
+        for cpus in cpu_sets(config):
+            cpu_queue.put(cpus)
+
+    return ProcessPoolExecutor(max_workers=config.workers,
+                               initializer=_init_worker,
+                               initargs=(config.cv_threads, cpu_queue))
+
+
+if __name__ == "__main__":
+    print(f"Available cpus: {available_cpus()}")
+    print("Calibration (seconds per frame):")
+    for threads, seconds in calibrate().items():
+        print(f"  {threads:>3} threads: {seconds * 1000:.1f} ms")
+    print(configure())
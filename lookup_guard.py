@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+
+# --- Guarding the registration lookup --- #
+"""
+the LTO site is slow and sometimes stalls, with fixed 10 s waits every scan
+paid the full timeout and throughput collapsed. GuardedLookup wraps the
+lookup function with:
+  - adaptive timeouts, derived from a rolling window of recent latencies
+  - hedged requests, a duplicate is sent when the first one passes the p95
+    latency and whichever answers first wins
+  - a circuit breaker that opens after repeated failures and fails fast with
+    VerificationUnavailable until a trial request succeeds again
+"""
+
+
+class VerificationUnavailable(Exception):
+    """the registration backend is failing or the circuit breaker is open"""
+
+
+# --- Rolling latency distribution --- #
+class LatencyTracker:
+    """keeps the last `window` latencies and answers percentile queries"""
+
+    def __init__(self, window=200, min_samples=10):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        """p in 0..100, None until there are enough samples"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+# --- Circuit breaker --- #
+class CircuitBreaker:
+    """closed -> open after failure_threshold failures in a row -> half-open after reset_timeout"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when a request may go out, while half-open only one trial request is let through"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def release_trial(self):
+        """lets the next request be the half-open trial when this one never reached the backend"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+# --- Hedged lookup with adaptive timeouts --- #
+class GuardedLookup:
+    """
+    calls lookup_fn(plate_number, timeout) -> result, lookup_fn must raise on
+    failure (check_plate with raise_errors=True does) and give up on its own
+    once timeout seconds have passed in total, a running lookup cannot be
+    stopped from outside.
+
+    at most max_workers lookups (browsers) run at once, counting hedges and
+    lookups whose caller already gave up. A lookup only starts when a slot is
+    free, so nothing waits in the executor queue to launch a browser for a
+    caller that is gone.
+
+    the timeout only grows from successful latencies and never above
+    max_timeout (default_timeout unless given), so an outage cannot push it up.
+    A lookup is only started with at least min_start seconds of the deadline
+    left (half of min_timeout unless given), a slot that frees up later counts
+    as all lookups busy
+    """
+
+    def __init__(self, lookup_fn, max_workers=4, default_timeout=10.0, min_timeout=2.0, max_timeout=None,
+                 timeout_factor=1.5, hedge_percentile=95, min_start=None, breaker=None, tracker=None):
+        self.lookup_fn = lookup_fn
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout if max_timeout is not None else default_timeout
+        self.timeout_factor = timeout_factor
+        self.hedge_percentile = hedge_percentile
+        self.min_start = min_start if min_start is not None else min_timeout / 2
+        self.breaker = breaker or CircuitBreaker()
+        self.tracker = tracker or LatencyTracker()
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lookup")
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def timeout(self):
+        """overall deadline for one lookup: a margin over the recent p99 of successful lookups"""
+        p99 = self.tracker.percentile(99)
+        if p99 is None:
+            return self.default_timeout
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_factor))
+
+    def hedge_delay(self):
+        """how long to wait for the first request before sending a duplicate"""
+        return self.tracker.percentile(self.hedge_percentile)
+
+    def _timed_call(self, plate_number, timeout):
+        start = time.monotonic()
+        result = self.lookup_fn(plate_number, timeout)
+        return result, time.monotonic() - start
+
+    def _start(self, plate_number, timeout):
+        """starts a lookup in a slot the caller has acquired"""
+        try:
+            future = self.executor.submit(self._timed_call, plate_number, timeout)
+        except Exception:
+            self.slots.release()
+            raise
+        # frees the slot when the lookup returns, fails or is cancelled before starting
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def __call__(self, plate_number):
+        if not self.breaker.allow():
+            raise VerificationUnavailable("verification unavailable (circuit open)")
+
+        start = time.monotonic()
+        deadline = self.timeout()
+        hedge_delay = self.hedge_delay()
+
+        # a slot that frees up too close to the deadline is of no use, the
+        # lookup could not answer in time and would be blamed on the backend
+        acquired = self.slots.acquire(timeout=max(0.0, deadline - self.min_start))
+        left = deadline - (time.monotonic() - start)
+        if acquired and left < self.min_start:
+            self.slots.release()
+            acquired = False
+        if not acquired:
+            # every browser is still busy with earlier (possibly stalled)
+            # lookups, a local limit and not a verdict on the backend
+            self.breaker.release_trial()
+            raise VerificationUnavailable("verification unavailable (all lookups busy)")
+        # time spent waiting for a slot counts against the deadline
+        primary = self._start(plate_number, left)
+        pending = {primary}
+        hedged = False
+        last_error = None
+
+        try:
+            while pending:
+                elapsed = time.monotonic() - start
+                remaining = deadline - elapsed
+                if remaining <= 0:
+                    break
+
+                wait_for = remaining
+                if not hedged and hedge_delay is not None and hedge_delay < deadline:
+                    wait_for = min(remaining, max(0.0, hedge_delay - elapsed))
+
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result, latency = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    self.tracker.record(latency)
+                    self.breaker.record_success()
+                    if future is not primary:
+                        self.hedges_won += 1
+                        metrics.LOOKUP_HEDGES.inc(result="won")
+                    return result
+
+                # first request passed the hedge point without answering, send a
+                # duplicate, but only when a browser is free right now
+                if not hedged and hedge_delay is not None and primary in pending \
+                        and time.monotonic() - start >= hedge_delay:
+                    hedged = True
+                    left = deadline - (time.monotonic() - start)
+                    if left >= self.min_start and self.slots.acquire(blocking=False):
+                        self.hedges_sent += 1
+                        metrics.LOOKUP_HEDGES.inc(result="sent")
+                        pending.add(self._start(plate_number, left))
+        finally:
+            # lookups still running finish on their own within their timeout
+            for future in pending:
+                future.cancel()
+
+        self.breaker.record_failure()
+        if last_error is not None and not pending:
+            raise VerificationUnavailable(f"verification unavailable ({last_error})")
+        # a timeout is not recorded as a latency, it would raise the next timeout
+        raise VerificationUnavailable(f"verification unavailable (no answer within {deadline:.1f} s)")
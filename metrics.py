@@ -0,0 +1,208 @@
+import atexit
+import bisect
+import os
+import threading
+
+# --- Runtime metrics --- #
+"""
+small in-process metrics registry (counters and latency histograms) for the
+recognition and lookup paths, exported in Prometheus text format either to a
+file or from a local HTTP endpoint:
+
+  PLATE_METRICS_PORT=9108            serve http://127.0.0.1:9108/metrics
+  PLATE_METRICS_FILE=metrics.prom    write the file at exit (and on write_textfile())
+
+updates are a dict lookup and an add under a lock, cheap next to any OpenCV
+call. Every process has its own registry, with worker processes put {pid}
+in PLATE_METRICS_FILE so each one writes its own file (batch.py refuses a
+shared path). Pool workers never run atexit, they write after every task.
+"""
+
+# latency buckets in seconds, from fast OpenCV stages to slow network lookups
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        return self._values.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.label_names:
+            items = [((), 0)]
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in items]
+
+
+class Histogram:
+    """cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', repr(bound))])} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """holds the metrics of this process and renders them"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- The series for recognition and lookup --- #
+IMAGES_PROCESSED = REGISTRY.counter("plate_images_processed_total", "Images run through recognition")
+RECOGNITION_FAILURES = REGISTRY.counter("plate_recognition_failures_total",
+                                        "Recognitions that produced no plate text", ("reason",))
+UNKNOWN_CHARACTERS = REGISTRY.counter("plate_unknown_characters_total",
+                                      "Characters emitted as '?' because no match was confident enough")
+STAGE_SECONDS = REGISTRY.histogram("plate_stage_seconds", "Latency of each recognition stage", ("stage",))
+ESCALATIONS = REGISTRY.counter("plate_escalation_total", "Reads by the escalation rung that produced them",
+                               ("rung", "confident"))
+LOOKUP_SECONDS = REGISTRY.histogram("plate_lookup_seconds", "Registration lookup latency", ("source",))
+LOOKUPS = REGISTRY.counter("plate_lookups_total", "Registration lookups by outcome", ("status", "source"))
+LOOKUP_CACHE = REGISTRY.counter("plate_lookup_cache_total", "Local registry hits and misses", ("result",))
+LOOKUP_HEDGES = REGISTRY.counter("plate_lookup_hedges_total", "Hedged duplicate lookups", ("result",))
+
+
+# --- Exporting --- #
+def write_textfile(path=None):
+    """writes the metrics atomically (for a node_exporter textfile collector or later scraping)"""
+    path = path or os.environ.get("PLATE_METRICS_FILE")
+    if not path:
+        return None
+    path = path.replace("{pid}", str(os.getpid()))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+    return path
+
+
+_server = None
+
+def serve(port=9108, address="127.0.0.1"):
+    """serves /metrics from a background thread, returns the server"""
+    global _server
+    if _server is not None:
+        return _server
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes every few seconds would flood the console
+
+    _server = ThreadingHTTPServer((address, port), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Serving metrics on http://{address}:{port}/metrics")
+    return _server
+
+
+_file_at_exit = False
+
+def start_from_env():
+    """starts the exporters configured with PLATE_METRICS_PORT / PLATE_METRICS_FILE"""
+    global _file_at_exit
+    port = os.environ.get("PLATE_METRICS_PORT")
+    if port:
+        try:
+            serve(int(port))
+        except Exception as e:
+            print(f"Error starting metrics endpoint: {e}")
+    if os.environ.get("PLATE_METRICS_FILE") and not _file_at_exit:
+        _file_at_exit = True
+        atexit.register(write_textfile)
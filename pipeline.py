@@ -0,0 +1,279 @@
+import contextvars
+import os
+import queue
+import sys
+import threading
+import time
+
+import exec_config
+
+# --- Streaming pipeline --- #
+"""
+recognizes and looks up many images with the stages overlapped:
+
+    decode -> detect/crop -> segment/match -> lookup
+
+every stage has its own worker threads (OpenCV and the browser both release
+the GIL) and a bounded queue in front of it, so a slow stage pushes back on
+the ones before it instead of piling up decoded frames. While one image
+waits seconds for the LTO site the next ones are already being read, and a
+batch takes about as long as its slowest stage instead of the sum of all.
+At most queue_size images wait in front of each stage and every worker holds
+one, which caps the memory.
+
+results come out as they complete, not in input order.
+"""
+
+# marks the end of the input on a stage queue
+_DONE = object()
+
+
+def _empty_result():
+    """same keys as plate_detect.new_result, without touching the metrics or OpenCV"""
+    return {"text": None, "candidates": [], "error": None, "timings": {}}
+
+
+class Stage:
+    """workers of one stage, the last one to finish closes the next queue"""
+
+    def __init__(self, name, fn, workers, queue_size, pipeline):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pipeline = pipeline
+        self.next = None  # the next Stage, None for the last one
+        self._running = self.workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"pipeline-{name}-{i}", daemon=True)
+                        for i in range(self.workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self):
+        try:
+            self._work()
+        finally:
+            # whatever happened, the stages after this one must hear the end
+            self._finish()
+
+    def _work(self):
+        pipeline = self.pipeline
+        while not pipeline.stopped.is_set():
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+
+            try:
+                # each image keeps its own context so its debug artifacts are named after it
+                keep_going = item["context"].run(self.fn, item)
+            except Exception as e:
+                print(f"Error in pipeline stage {self.name}: {e}")
+                result = item["result"]
+                result["error"] = result["error"] or f"{self.name} failed: {e}"
+                keep_going = False
+
+            # failed images skip the remaining stages
+            if keep_going and self.next is not None:
+                pipeline.put(self.next.queue, item)
+            else:
+                pipeline.put(pipeline.output, item)
+
+    def _finish(self):
+        pipeline = self.pipeline
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            if self.next is not None:
+                for _ in range(self.next.workers):
+                    pipeline.put(self.next.queue, _DONE)
+            else:
+                pipeline.put(pipeline.output, _DONE)
+
+
+class Pipeline:
+    """
+    the four stages with their own concurrency. The defaults follow
+    exec_config: detect and match split the configured workers between them
+    (each also running cv_threads OpenCV threads), so together they keep as
+    many images on the CPU as a batch would. Decode and lookup are I/O bound
+    and get their own small pools. lookup=False stops after recognition.
+    With escalate (the default, as in read_license_plate) the detect stage
+    finds the plate at low resolution and the match stage climbs the rest of
+    escalation.py's ladder when that read is not confident
+    """
+
+    def __init__(self, template_directory="templates", recognizer=None, config=None,
+                 decode_workers=2, detect_workers=None, match_workers=None, lookup_workers=4,
+                 queue_size=4, lookup=True, registry_db=None, escalate=None):
+        self.template_directory = template_directory
+        self.recognizer = recognizer
+        self.config = config or exec_config.get_config()
+        self.lookup = lookup
+        self.registry_db = registry_db
+        if escalate is None:
+            escalate = os.environ.get("PLATE_ESCALATE", "1") not in ("", "0")
+        self.escalate = escalate
+        self.queue_size = queue_size
+        # both CPU stages at config.workers each would run twice the cores; with a
+        # single worker each stage still needs one thread
+        cpu_workers = self.config.workers
+        self.workers = {
+            "decode": decode_workers,
+            "detect": detect_workers or max(1, cpu_workers // 2),
+            "match": match_workers or max(1, cpu_workers - cpu_workers // 2),
+            "lookup": lookup_workers,
+        }
+        self._local = threading.local()
+
+    # --- Stage functions, run in the image's context on a stage worker --- #
+    # each returns True when the image should continue to the next stage
+    def _decode(self, item):
+        import plate_detect
+        # the dict from _feed is kept, the other stages and the caller hold it already
+        item["result"].update(plate_detect.new_result(item["image_path"]))
+        item["image"] = plate_detect.decode_stage(item["result"], item["image_path"])
+        return item["image"] is not None
+
+    def _reader(self):
+        # EscalatingReader reuses its detectors' buffers, so every worker thread has its own
+        import escalation
+        return escalation.get_reader()
+
+    def _detect(self, item):
+        import plate_detect
+        if self.escalate:
+            # the image goes on to the match stage even without a contour, full resolution may find one
+            item["contour"] = self._reader().fast_contour(item["result"], item["image"])
+            return True
+        # PlateDetector reuses its buffers, so every worker thread has its own
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = plate_detect.PlateDetector()
+        item["plate"] = plate_detect.detect_stage(item["result"], item.pop("image"), detector)
+        return item["plate"] is not None
+
+    def _match(self, item):
+        import plate_detect
+        if self.escalate:
+            result = self._reader().read(item["result"], item.pop("image"), self.recognizer,
+                                         self.template_directory, item.pop("contour"))
+        else:
+            result = plate_detect.match_stage(item["result"], item.pop("plate"), self.recognizer,
+                                              self.template_directory)
+        return bool(result["text"]) and not result["error"]
+
+    def _lookup(self, item):
+        import checkPlate
+        result = item["result"]
+        result["lookup"] = checkPlate.lookup_plate(result["text"], result["candidates"], self.registry_db)
+        result["timings"]["lookup"] = result["lookup"]["seconds"]
+        return True
+
+    # --- Running --- #
+    def put(self, q, item):
+        """blocking put that gives up once the pipeline is stopped"""
+        while not self.stopped.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, image_paths, first):
+        try:
+            self._feed_items(image_paths, first)
+        except Exception as e:
+            # run() raises it once the images fed before it have come out
+            self._feed_error = e
+        finally:
+            # also when iterating image_paths failed, the workers must still stop
+            for _ in range(first.workers):
+                self.put(first.queue, _DONE)
+
+    def _feed_items(self, image_paths, first):
+        for image_path in image_paths:
+            # the result exists before any stage runs, so a stage failing at once still has somewhere to
+            # put its error
+            item = {"image_path": image_path, "context": contextvars.copy_context(), "result": _empty_result()}
+            if not self.put(first.queue, item):
+                return
+
+    def run(self, image_paths):
+        """
+        yields (image_path, result) as images complete, result as
+        read_license_plate plus "lookup". When iterating image_paths fails,
+        the images before the failure are still yielded, then the error is raised
+        """
+        exec_config.apply(self.config)
+
+        self.stopped = threading.Event()
+        self.output = queue.Queue()
+        self._feed_error = None
+        steps = [("decode", self._decode), ("detect", self._detect), ("match", self._match)]
+        if self.lookup:
+            steps.append(("lookup", self._lookup))
+        stages = [Stage(name, fn, self.workers[name], self.queue_size, self) for name, fn in steps]
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+
+        for stage in stages:
+            stage.start()
+        feeder = threading.Thread(target=self._feed, args=(image_paths, stages[0]),
+                                  name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        try:
+            while True:
+                item = self.output.get()
+                if item is _DONE:
+                    break
+                yield item["image_path"], item["result"]
+            # a partly fed batch must not look complete
+            feeder.join()
+            if self._feed_error is not None:
+                raise self._feed_error
+        finally:
+            # also reached when the caller stops iterating early
+            self.stopped.set()
+            feeder.join()
+            for stage in stages:
+                for thread in stage.threads:
+                    thread.join()
+
+
+def run_pipeline(image_paths, template_directory="templates", **options):
+    """shortcut for Pipeline(...).run(image_paths)"""
+    return Pipeline(template_directory, **options).run(image_paths)
+
+
+# --- For running a batch from the terminal --- #
+if __name__ == "__main__":
+    # usage: python pipeline.py <image or directory> [...]
+    # PLATE_NO_LOOKUP=1 stops after recognition
+    paths = []
+    for arg in sys.argv[1:] or ["test_images"]:
+        if os.path.isdir(arg):
+            paths.extend(os.path.join(arg, name) for name in sorted(os.listdir(arg))
+                         if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")))
+        else:
+            paths.append(arg)
+
+    import metrics
+    metrics.start_from_env()
+
+    config = exec_config.configure(os.environ.get("PLATE_EXEC_PROFILE", "throughput"))
+    print(f"Using {config}")
+    start = time.perf_counter()
+    pipeline = Pipeline(config=config, lookup=not os.environ.get("PLATE_NO_LOOKUP"))
+    for image_path, result in pipeline.run(paths):
+        status = result["lookup"]["status"] if "lookup" in result else ""
+        print(f"{image_path}: {result['error'] or result['text']} {status}".rstrip())
+    print(f"{len(paths)} images in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,161 @@
+import itertools
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+# --- Optional debugging and visualization helpers --- #
+"""
+these used to be done by hand with matplotlib inside plate_detect.py,
+matplotlib is only imported when one of these functions is actually called
+so the recognition path never pays for it
+"""
+
+def _pyplot():
+    """imports matplotlib on first use"""
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("Error: matplotlib is not installed, visualization is unavailable")
+        return None
+    return plt
+
+# --- Showing a single image --- #
+def show_image(image, title=""):
+    """shows a single BGR or grayscale image"""
+    plt = _pyplot()
+    if plt is None or image is None:
+        return
+
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        plt.imshow(image)
+    else:
+        plt.imshow(image, cmap="gray")
+    plt.title(title)
+    plt.axis("off")
+    plt.show()
+
+# --- Showing the intermediate images of the pipeline --- #
+def show_stages(image_path):
+    """runs the pipeline step by step and plots every intermediate image"""
+    import plate_detect
+
+    plt = _pyplot()
+    if plt is None:
+        return
+
+    image = plate_detect.load_image(image_path)
+    preprocessed = plate_detect.preprocess_image(image)
+
+    plate_contour = plate_detect.locate_plate(preprocessed)
+
+    stages = [("Original", cv2.cvtColor(image, cv2.COLOR_BGR2RGB)), ("Preprocessed", preprocessed)]
+
+    if plate_contour is not None:
+        overlay = image.copy()
+        cv2.drawContours(overlay, [plate_contour], -1, (0, 255, 0), 3)
+        stages.append(("Plate contour", cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB)))
+
+        cropped = plate_detect.crop_plate(image, plate_contour)
+        if cropped is not None:
+            stages.append(("Straightened plate", cropped))
+            _, _, thresh = plate_detect.segment_characters(cropped)
+            if thresh is not None:
+                stages.append(("Threshold", thresh))
+
+    fig, axes = plt.subplots(1, len(stages), figsize=(4 * len(stages), 4))
+    for ax, (title, img) in zip(axes, stages):
+        ax.imshow(img, cmap=None if img.ndim == 3 else "gray")
+        ax.set_title(title)
+        ax.axis("off")
+    plt.show()
+
+# --- Asynchronous debug artifact dump --- #
+"""
+DebugDumper captures intermediate images of the recognition path and writes
+them from a background thread. The recognition thread only puts a small
+tuple on a bounded queue, encoding and disk writes happen on the writer
+thread, and when the queue is full the artifact is dropped instead of making
+recognition wait.
+"""
+
+class DebugDumper:
+    """bounded queue + background writer thread for debug images"""
+
+    def __init__(self, output_dir="debug_artifacts", max_queue=64):
+        self.output_dir = output_dir
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self._counter = itertools.count()
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, name="debug-dumper", daemon=True)
+        self._thread.start()
+
+    def new_prefix(self, label):
+        """unique file prefix for one recognized image"""
+        base = os.path.splitext(os.path.basename(str(label)))[0] or "image"
+        return f"{base}_{os.getpid()}_{next(self._counter):05d}"
+
+    def submit(self, name, render, *args):
+        """
+        queues one artifact, render(*args) runs on the writer thread and returns
+        the image to write (render=None writes args[0] as is). Never blocks,
+        returns False when the artifact was dropped
+        """
+        try:
+            self.queue.put_nowait((name, render, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                name, render, args = item
+                image = render(*args) if render is not None else args[0]
+                if image is not None:
+                    cv2.imwrite(os.path.join(self.output_dir, f"{name}.png"), image)
+                    self.written += 1
+            except Exception as e:
+                print(f"Error writing debug artifact: {e}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """waits until everything queued so far is on disk"""
+        self.queue.join()
+
+    def close(self):
+        """writes the remaining artifacts and stops the writer thread"""
+        self.queue.put(None)
+        self._thread.join()
+
+
+# --- Renderers, these run on the writer thread --- #
+def render_contour(image, contour):
+    """draws the chosen plate contour on a copy of the frame"""
+    overlay = image.copy()
+    cv2.drawContours(overlay, [contour], -1, (0, 255, 0), 3)
+    return overlay
+
+
+def render_character(char_img, candidates):
+    """enlarged character with its top template scores written underneath"""
+    char_big = cv2.resize(char_img, (char_img.shape[1] * 3, char_img.shape[0] * 3),
+                          interpolation=cv2.INTER_NEAREST)
+    line_h = 22
+    panel = np.zeros((char_big.shape[0] + line_h * len(candidates) + 6, max(char_big.shape[1], 150)), dtype=np.uint8)
+    panel[:char_big.shape[0], :char_big.shape[1]] = char_big
+    for i, (char_name, score) in enumerate(candidates):
+        y = char_big.shape[0] + line_h * (i + 1)
+        cv2.putText(panel, f"{char_name}: {score:.2f}", (4, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 1)
+    return panel
@@ -1,7 +1,52 @@
 import cv2
 import numpy as np
 import os
-import matplotlib.pyplot as plt # For debugging and visualization in python notebooks
+import time
+import heapq
+import atexit
+import contextvars
+from concurrent.futures import wait
+
+import metrics
+
+# matplotlib used to be imported here for notebook debugging, it now lives in
+# plate_debug.py so importing this module stays cheap
+
+# --- Debug artifacts --- #
+"""
+when enabled, intermediate images (edge maps, chosen contour, straightened
+plate, threshold, characters with their top-3 scores) are handed to a
+plate_debug.DebugDumper which writes them from a background thread.
+Set PLATE_DEBUG_DIR or call enable_debug() to turn it on.
+"""
+_debug = None
+_debug_prefix = contextvars.ContextVar("debug_prefix", default="image")
+
+def enable_debug(output_dir="debug_artifacts", max_queue=64):
+    """starts dumping intermediate images to output_dir"""
+    global _debug
+    import plate_debug
+    disable_debug()
+    _debug = plate_debug.DebugDumper(output_dir, max_queue)
+    return _debug
+
+def disable_debug():
+    """stops dumping, artifacts already queued are still written"""
+    global _debug
+    if _debug is not None:
+        _debug.close()
+        _debug = None
+
+def _capture(name, render, *args):
+    """queues a debug artifact, does nothing when debugging is off"""
+    if _debug is not None:
+        _debug.submit(f"{_debug_prefix.get()}_{name}", render, *args)
+
+# make sure queued artifacts reach the disk before the interpreter exits
+atexit.register(disable_debug)
+
+if os.environ.get("PLATE_DEBUG_DIR"):
+    enable_debug(os.environ["PLATE_DEBUG_DIR"])
 
 # --- Loading the image --- #
 def load_image(image_path):
@@ -37,43 +82,269 @@ def pyramid(image, scale=1.5, min_size=(20, 20)):
 
 
 # --- Finding the license plate contour --- #
-def find_plate_contour(processed_image):
-    """this function finds the contour of the license plate since plates are rectangular in shape"""
+def find_plate_contour(processed_image, blurred=None, edged=None):
+    """
+    this function finds the contour of the license plate since plates are rectangular in shape.
+    blurred and edged are optional preallocated output buffers (see PlateDetector)
+    """
+    candidates = find_plate_contours(processed_image, blurred, edged, limit=1)
+    return candidates[0] if candidates else None
+
+def find_plate_contours(processed_image, blurred=None, edged=None, limit=None):
+    """like find_plate_contour but returns every plate-shaped contour, biggest first (at most limit)"""
     try:
         # apply gaussian blur to reduce noise and then canny edge detection to find edges
-        blurred = cv2.GaussianBlur(processed_image, (7, 7), 0)
-        edged = cv2.Canny(blurred, 50, 200)
-        
+        blurred = cv2.GaussianBlur(processed_image, (7, 7), 0, dst=blurred)
+        edged = cv2.Canny(blurred, 50, 200, edges=edged)
+        if _debug is not None:
+            # the buffer may be reused by the next frame before the writer gets to it
+            _capture(f"edges_{edged.shape[1]}x{edged.shape[0]}", None, edged.copy())
+
         """ 
         findContours basically detects boundary points of shapes in the image
-        and only keeps the 10 biggest contours which are likely to be the license plate
+        and only keeps the 10 biggest contours which are likely to be the license plate.
+        findContours no longer modifies its input (OpenCV 3.2+) so edged is not copied
         """
-        contours, _ = cv2.findContours(edged.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
+        contours, _ = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return select_plate_contours(contours, limit=limit)
+    except Exception as e:
+        print(f"Error in find_plate_contour: {e}")
+        return []
 
-        plate_contour = None
-        for c in contours:
-            """
-            this helps identify shapes with 4 sides
-            since license plates are rectangular
-            """
-            perimeter = cv2.arcLength(c, True)
-            approx = cv2.approxPolyDP(c, 0.018 * perimeter, True)
+def select_plate_contours(contours, top=10, limit=None):
+    """every 4-sided, plate-shaped contour among the biggest ones, biggest first (at most limit)"""
+    # partial selection, only the top few are ordered instead of sorting them all
+    contours = heapq.nlargest(top, contours, key=cv2.contourArea)
 
-            if len(approx) == 4:
-                (x, y, w, h) = cv2.boundingRect(approx)
-                aspect_ratio = float(w) / h
+    candidates = []
+    for c in contours:
+        """
+        this helps identify shapes with 4 sides
+        since license plates are rectangular
+        """
+        perimeter = cv2.arcLength(c, True)
+        approx = cv2.approxPolyDP(c, 0.018 * perimeter, True)
+
+        if len(approx) == 4:
+            (x, y, w, h) = cv2.boundingRect(approx)
+            aspect_ratio = float(w) / h
 
-                # change as needed but these values work for Philippine plates
-                if 1.5 < aspect_ratio < 4.5 and w > 30 and h > 15:
-                    plate_contour = approx
+            # change as needed but these values work for Philippine plates
+            if 1.5 < aspect_ratio < 4.5 and w > 30 and h > 15:
+                candidates.append(approx)
+                if limit is not None and len(candidates) >= limit:
                     break
 
+    return candidates
+
+# --- Reusable detection engine --- #
+class PlateDetector:
+    """
+    detection engine for repeated use on same-sized frames (camera, batch).
+    Keeps the grayscale, bilateral, pyramid, blur and edge buffers between
+    calls and only reallocates them when the frame size changes.
+    With parallel=True the pyramid levels are searched at the same time on
+    exec_config's thread pool (the OpenCV calls release the GIL).
+    Not thread-safe, use one detector per thread.
+    """
+
+    def __init__(self, camera_profile=None, scale=1.5, min_size=(20, 20), parallel=False):
+        self.camera_profile = camera_profile
+        self.parallel = parallel
+        self.scale = scale
+        self.min_size = min_size
+        self._shape = None
+        self._gray = None
+        self._filtered = None
+        self._region_gray = None  # the camera profile's region of interest, preprocessed on its own
+        self._region_filtered = None
+        self._levels = []  # [image, blurred, edged] per pyramid level
+
+    def _ensure_buffers(self, shape):
+        """(re)allocates the work buffers when the frame size changes"""
+        shape = tuple(shape[:2])
+        if shape == self._shape:
+            return
+        self._shape = shape
+        height, width = shape
+        self._gray = np.empty(shape, dtype=np.uint8)
+        self._filtered = np.empty(shape, dtype=np.uint8)
+
+        # same level sizes as pyramid(), level 0 is the filtered frame itself
+        self._levels = [[None, np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8)]]
+        while True:
+            width, height = int(width / self.scale), int(height / self.scale)
+            if width < self.min_size[0] or height < self.min_size[1]:
+                break
+            level_shape = (height, width)
+            self._levels.append([np.empty(level_shape, dtype=np.uint8),
+                                 np.empty(level_shape, dtype=np.uint8),
+                                 np.empty(level_shape, dtype=np.uint8)])
+
+    def preprocess(self, frame):
+        """preprocess_image into the reused buffers, the result is only valid until the next call"""
+        self._ensure_buffers(frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.bilateralFilter(self._gray, 11, 17, 17, dst=self._filtered)
+        return self._filtered
+
+    def _preprocess_region(self, region):
+        """preprocess for a cropped region of a BGR frame, its buffers follow the region size"""
+        shape = region.shape[:2]
+        if self._region_gray is None or self._region_gray.shape != shape:
+            self._region_gray = np.empty(shape, dtype=np.uint8)
+            self._region_filtered = np.empty(shape, dtype=np.uint8)
+        cv2.cvtColor(region, cv2.COLOR_BGR2GRAY, dst=self._region_gray)
+        cv2.bilateralFilter(self._region_gray, 11, 17, 17, dst=self._region_filtered)
+        return self._region_filtered
+
+    def _pyramid(self, preprocessed):
+        """pyramid() without allocations, yields (level image, blurred buffer, edged buffer)"""
+        self._ensure_buffers(preprocessed.shape)
+        self._levels[0][0] = preprocessed
+        previous = preprocessed
+        for level in self._levels:
+            image, blurred, edged = level
+            if image is not previous:
+                cv2.resize(previous, (image.shape[1], image.shape[0]), dst=image, interpolation=cv2.INTER_AREA)
+            yield image, blurred, edged
+            previous = image
+
+    def locate(self, preprocessed):
+        """
+        finds the plate contour in full-resolution frame coordinates.
+        With a camera profile, the learned region of interest is searched first
+        at full quality and the whole-frame pyramid is only the fallback
+        """
+        plate_contour = self._locate_roi(preprocessed, lambda region: region)
+        if plate_contour is not None:
+            return plate_contour
+        return self._locate_frame(preprocessed)
+
+    def _locate_roi(self, image, prepare):
+        """
+        the contour found in the camera profile's region of interest of image,
+        in frame coordinates, or None (no profile, untrained or a miss).
+        prepare turns the cropped region into a preprocessed one
+        """
+        camera_profile = self.camera_profile
+        if camera_profile is None:
+            return None
+        frame_shape = image.shape[:2]
+        roi = camera_profile.roi(frame_shape)
+        if roi is None:
+            return None
+
+        x, y, w, h = roi
+        plate_contour = find_plate_contour(prepare(image[y:y + h, x:x + w]))
+        camera_profile.record(plate_contour is not None)
+        if plate_contour is None:
+            return None
+        plate_contour = plate_contour + np.array([x, y], dtype=plate_contour.dtype)
+        camera_profile.update(plate_contour, frame_shape)
         return plate_contour
-    except Exception as e:
-        print(f"Error in find_plate_contour: {e}")
-        return None
-    
+
+    def _locate_frame(self, preprocessed):
+        """the whole-frame pyramid search, in frame coordinates"""
+        frame_shape = preprocessed.shape
+        if self.parallel and len(self._levels) > 1:
+            img, plate_contour = self._search_parallel(preprocessed)
+        else:
+            img, plate_contour = self._search_serial(preprocessed)
+
+        if plate_contour is None:
+            return None
+
+        # contours found on smaller pyramid levels are scaled back to the frame
+        if img.shape != frame_shape:
+            scale = np.array([frame_shape[1] / img.shape[1], frame_shape[0] / img.shape[0]])
+            plate_contour = np.round(plate_contour * scale).astype(np.int32)
+        if self.camera_profile is not None:
+            self.camera_profile.update(plate_contour, frame_shape)
+        return plate_contour
+
+    def _search_serial(self, preprocessed):
+        """one pyramid level after the other, returns (level image, contour) of the first hit"""
+        for img, blurred, edged in self._pyramid(preprocessed):
+            plate_contour = find_plate_contour(img, blurred, edged)
+            if plate_contour is not None:
+                return img, plate_contour
+        return None, None
+
+    def _search_parallel(self, preprocessed):
+        """
+        searches every pyramid level at once and keeps the hit of the largest
+        level, the same quad the serial search would return
+        """
+        import exec_config
+
+        levels = list(self._pyramid(preprocessed))  # resizing is cheap and sequential by nature
+        pool = exec_config.thread_pool()
+        # each task gets its own copy of the context so debug captures keep their prefix
+        futures = [pool.submit(contextvars.copy_context().run, find_plate_contour, img, blurred, edged)
+                   for img, blurred, edged in levels]
+        try:
+            for (img, _, _), future in zip(levels, futures):
+                plate_contour = future.result()
+                if plate_contour is not None:
+                    return img, plate_contour
+            return None, None
+        finally:
+            # the buffers are reused by the next frame, wait for the levels still running
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+    def detect(self, frame):
+        """
+        finds the plate contour of a BGR frame, in frame coordinates. With a
+        trained camera profile only the region of interest is preprocessed,
+        the grayscale and bilateral filter of the whole frame are paid only
+        when the region misses
+        """
+        plate_contour = self._locate_roi(frame, self._preprocess_region)
+        if plate_contour is not None:
+            return plate_contour
+        return self._locate_frame(self.preprocess(frame))
+
+    def candidates(self, frame, limit=3):
+        """
+        up to limit different plate-shaped contours of a BGR frame, in frame
+        coordinates, best first. The first is the one detect() would return
+        without a camera profile, the others are the fallbacks of the
+        escalation ladder (see escalation.py)
+        """
+        preprocessed = self.preprocess(frame)
+        frame_shape = preprocessed.shape
+        found = []
+        for img, blurred, edged in self._pyramid(preprocessed):
+            for plate_contour in find_plate_contours(img, blurred, edged):
+                if img.shape != frame_shape:
+                    scale = np.array([frame_shape[1] / img.shape[1], frame_shape[0] / img.shape[0]])
+                    plate_contour = np.round(plate_contour * scale).astype(np.int32)
+                # smaller levels find the same plate again
+                if not any(_same_region(plate_contour, other) for other in found):
+                    found.append(plate_contour)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+def _same_region(contour_a, contour_b, min_overlap=0.7):
+    """True when the bounding boxes of two contours mostly overlap (intersection over union)"""
+    ax, ay, aw, ah = cv2.boundingRect(contour_a)
+    bx, by, bw, bh = cv2.boundingRect(contour_b)
+    w = min(ax + aw, bx + bw) - max(ax, bx)
+    h = min(ay + ah, by + bh) - max(ay, by)
+    if w <= 0 or h <= 0:
+        return False
+    intersection = w * h
+    return intersection / float(aw * ah + bw * bh - intersection) >= min_overlap
+
+# --- Locating the plate in the whole frame --- #
+def locate_plate(preprocessed, camera_profile=None):
+    """finds the plate contour in full-resolution frame coordinates (one-off PlateDetector.locate)"""
+    return PlateDetector(camera_profile).locate(preprocessed)
+
 # --- Cropping the license plate from the image --- #
 def crop_plate(image, plate_contour, plate_type="car"):
     """crops and straightens the 4-point contour to a flat, top-down image. Supports car and motorcycle plate sizes"""
@@ -163,16 +434,40 @@ def load_templates(template_directory="templates"):
     return templates
 
 # --- Segmenting characters from the license plate --- #
-def segment_characters(straightened_plate):
+THRESHOLDS = ("otsu", "otsu_equalized", "adaptive")
+
+def threshold_plate(straightened_plate, method="otsu"):
+    """
+    binarizes the plate, characters white on black.
+    "otsu" is the default, "otsu_equalized" evens out shadows and glare with
+    CLAHE first and "adaptive" thresholds every neighbourhood on its own
+    (for plates that are lit unevenly)
+    """
+    if method == "otsu_equalized":
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4, 8))
+        equalized = clahe.apply(straightened_plate)
+        return cv2.threshold(equalized, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    if method == "adaptive":
+        # a block about a third of a character high keeps strokes whole
+        block = max(3, (straightened_plate.shape[0] // 4) | 1)
+        return cv2.adaptiveThreshold(straightened_plate, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY_INV, block, 10)
+    if method != "otsu":
+        raise ValueError(f"Unknown threshold: {method} (expected one of {THRESHOLDS})")
+    return cv2.threshold(straightened_plate, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+
+def segment_characters(straightened_plate, threshold="otsu"):
     """finds, straigthens, and sorts character contours"""
     try:
         # threshold the plate image
         """
         we used otsu's thresholding to get a binary image for better contour detection
-        since the characters are usually darker on a lighter background
+        since the characters are usually darker on a lighter background.
+        threshold picks another method (see threshold_plate) for hard plates
         """
-        thresh = cv2.threshold(straightened_plate, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        thresh = threshold_plate(straightened_plate, threshold)
+        _capture("thresh", None, thresh)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         character_data = []
         for c in contours:
@@ -234,9 +529,10 @@ def recognize_characters_template_matching(character_images, templates):
     TARGET_W = 40 
     TARGET_H = 80 
 
-    for char_img in character_images:
+    for index, char_img in enumerate(character_images):
         best_match_score = -1
         best_match_char = "?"
+        scores = []
 
         # resize character to standard size
         char_resized = cv2.resize(char_img, (TARGET_W, TARGET_H), interpolation=cv2.INTER_AREA)
@@ -248,10 +544,16 @@ def recognize_characters_template_matching(character_images, templates):
             # perform template matching and get the best match score
             result = cv2.matchTemplate(char_resized, template_resized, cv2.TM_CCOEFF_NORMED)
             _, max_val, _, _ = cv2.minMaxLoc(result)
+            scores.append((char_name, max_val))
             if max_val > best_match_score:
                 best_match_score = max_val
                 best_match_char = char_name
 
+        if _debug is not None:
+            import plate_debug
+            top3 = sorted(scores, key=lambda item: item[1], reverse=True)[:3]
+            _capture(f"char{index:02d}", plate_debug.render_character, char_img, top3)
+
         # confidence threshold for accepting a match (change as needed)
         if best_match_score > 0.4: 
             plate_text += best_match_char
@@ -261,31 +563,142 @@ def recognize_characters_template_matching(character_images, templates):
     return plate_text
 
 # --- Function to summarize the entire process --- #
-def recognize_license_plate(image_path, template_directory="templates"):
-    """Full process to recognize license plate from image."""
+def read_license_plate(image_path, template_directory="templates", recognizer=None, camera_profile=None,
+                       detector=None, parallel=False, escalate=None):
+    """
+    Full process to recognize license plate from image, with details.
+    recognizer is a recognizers.Recognizer or its name ("template" or
+    "classifier", default from PLATE_RECOGNIZER). camera_profile is an
+    optional roi_prior.CameraProfile for fixed cameras, detector a PlateDetector
+    to reuse across calls (its own camera profile is used then, when escalating
+    it does the full resolution retries and its profile steers the fast
+    rung). parallel
+    spreads pyramid levels and characters over threads to cut the latency of
+    a single image. escalate (default on, PLATE_ESCALATE=0 turns it off)
+    reads a low resolution copy first and only retries harder when the read
+    is not confident, see escalation.py. Returns a dict with the
+    text, the per-character candidates [(char, score), ...], the seconds
+    spent in each stage and an error message when a step failed
+    (plus the attempts and the accepted rung when escalating).
+    """
+    result = new_result(image_path)
+
+    image = decode_stage(result, image_path)
+    if image is None:
+        return result
+
+    if escalate is None:
+        escalate = os.environ.get("PLATE_ESCALATE", "1") not in ("", "0")
+    if escalate:
+        import escalation
+        reader = escalation.get_reader(camera_profile, detector, parallel)
+        return reader.read(result, image, recognizer, template_directory)
+
+    if detector is None:
+        detector = PlateDetector(camera_profile, parallel=parallel)
+    cropped_plate = detect_stage(result, image, detector)
+    if cropped_plate is None:
+        return result
+
+    return match_stage(result, cropped_plate, recognizer, template_directory, parallel)
+
+# --- The stages of read_license_plate --- #
+"""
+read_license_plate runs these one after the other, pipeline.py runs each
+on its own workers. Every stage fills in the shared result dict and returns
+what the next stage needs, or None after recording the error
+"""
+
+def new_result(image_path):
+    """empty result for one image, also names its debug artifacts"""
+    metrics.IMAGES_PROCESSED.inc()
+    if _debug is not None:
+        _debug_prefix.set(_debug.new_prefix(image_path))
+    return {"text": None, "candidates": [], "error": None, "timings": {}}
+
+def decode_stage(result, image_path):
+    """loads the image"""
+    stage_start = time.perf_counter()
     image = load_image(image_path)
-    preprocessed = preprocess_image(image)
-
-    plate_contour = None
-    for img in pyramid(preprocessed):
-        plate_contour = find_plate_contour(img)
-        if plate_contour is not None:
-            break
+    _stage_done(result["timings"], "decode", stage_start)
+    if image is None:
+        _fail(result, "Failed to load image", "load_failed")
+    return image
 
+def detect_stage(result, image, detector):
+    """finds the plate and returns it straightened"""
+    timings = result["timings"]
+    stage_start = time.perf_counter()
+    plate_contour = detector.detect(image)
+    _stage_done(timings, "detect", stage_start)
     if plate_contour is None:
-        return "License plate contour not found"
+        _fail(result, "License plate contour not found", "contour_not_found")
+        return None
+
+    if _debug is not None:
+        import plate_debug
+        # render_contour draws on its own copy on the writer thread, the decoded frame is never written to
+        _capture("contour", plate_debug.render_contour, image, plate_contour)
 
+    stage_start = time.perf_counter()
     cropped_plate = crop_plate(image, plate_contour)
+    _stage_done(timings, "crop", stage_start)
     if cropped_plate is None:
-        return "Failed to crop license plate"
+        _fail(result, "Failed to crop license plate", "crop_failed")
+        return None
+    _capture("plate", None, cropped_plate)
+    return cropped_plate
 
-    templates = load_templates(template_directory)
+def match_stage(result, cropped_plate, recognizer=None, template_directory="templates", parallel=False):
+    """segments the plate and recognizes the characters"""
+    timings = result["timings"]
+    stage_start = time.perf_counter()
     segmented_chars, _, _ = segment_characters(cropped_plate)
+    _stage_done(timings, "segment", stage_start)
     if segmented_chars is None:
-        return "No characters segmented"
+        return _fail(result, "No characters segmented", "no_characters")
 
-    recognized_text = recognize_characters_template_matching(segmented_chars, templates)
-    return recognized_text
+    recognizer = _resolve_recognizer(result, recognizer, template_directory, parallel)
+    if recognizer is None:
+        return result
+
+    stage_start = time.perf_counter()
+    result["text"], result["candidates"] = recognizer.recognize(segmented_chars)
+    _stage_done(timings, "match", stage_start)
+    metrics.UNKNOWN_CHARACTERS.inc(result["text"].count("?"))
+    return result
+
+def _resolve_recognizer(result, recognizer, template_directory, parallel):
+    """a recognizer instance for a name (or the PLATE_RECOGNIZER default), None after recording the error"""
+    try:
+        import recognizers
+        if recognizer is None or isinstance(recognizer, str):
+            recognizer = recognizers.get_recognizer(recognizer or os.environ.get("PLATE_RECOGNIZER", "template"),
+                                                    template_directory, parallel=parallel)
+        return recognizer
+    except ValueError as e:
+        _fail(result, str(e), "templates_missing")
+        return None
+
+def _stage_done(timings, stage, stage_start):
+    """records how long a stage took, in the result and in the metrics"""
+    elapsed = time.perf_counter() - stage_start
+    # escalation.py runs stages more than once per image, the timings add up
+    timings[stage] = timings.get(stage, 0.0) + elapsed
+    metrics.STAGE_SECONDS.observe(elapsed, stage=stage)
+
+def _fail(result, message, reason):
+    """marks the result as failed and counts the failure reason"""
+    result["error"] = message
+    metrics.RECOGNITION_FAILURES.inc(reason=reason)
+    return result
+
+def recognize_license_plate(image_path, template_directory="templates", recognizer=None, camera_profile=None,
+                            detector=None, parallel=False, escalate=None):
+    """Full process to recognize license plate from image."""
+    result = read_license_plate(image_path, template_directory, recognizer, camera_profile, detector, parallel,
+                                escalate)
+    return result["error"] or result["text"]
 
 # --- For running the program as is --- #
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+import abc
+import os
+
+import cv2
+import numpy as np
+
+import plate_detect
+
+# --- Character recognizers --- #
+"""
+the matching step of recognize_license_plate is pluggable, a recognizer takes
+the segmented (white on black) character images and returns the best
+candidates with scores for every character:
+
+    text, candidates = recognizer.recognize(character_images)
+    candidates[i] -> [(char, score), ...] best first
+
+TemplateRecognizer is the original cv2.matchTemplate approach,
+FeatureRecognizer is a small classifier trained offline by
+train_classifier.py and scores the whole plate in one NumPy pass.
+"""
+
+# standardized size for matching, same as segment_characters
+TARGET_W = 40
+TARGET_H = 80
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "char_classifier.npz")
+
+
+class Recognizer(abc.ABC):
+    """base class, subclasses implement score()"""
+
+    # characters whose best score is not above this become "?"
+    min_score = 0.4
+
+    @abc.abstractmethod
+    def score(self, character_images, top_k=3):
+        """returns one [(char, score), ...] list per character, best first"""
+
+    def recognize(self, character_images, top_k=3):
+        """returns the plate text and the per-character candidates"""
+        if not character_images:
+            return "", []
+
+        candidates = self.score(character_images, top_k)
+
+        plate_text = ""
+        for index, (char_img, char_candidates) in enumerate(zip(character_images, candidates)):
+            if char_candidates and char_candidates[0][1] > self.min_score:
+                plate_text += char_candidates[0][0]
+            else:
+                plate_text += "?"
+
+            if plate_detect._debug is not None:
+                import plate_debug
+                plate_detect._capture(f"char{index:02d}", plate_debug.render_character, char_img, char_candidates[:3])
+
+        return plate_text, candidates
+
+
+# --- Template matching --- #
+class TemplateRecognizer(Recognizer):
+    """
+    correlation with one template per class, same scores as
+    recognize_characters_template_matching. With parallel=True the characters
+    are matched on exec_config's thread pool (matchTemplate releases the GIL)
+    """
+
+    def __init__(self, templates=None, template_directory="templates", parallel=False):
+        self.parallel = parallel
+        if templates is None:
+            templates = plate_detect.load_templates(template_directory)
+        if not templates:
+            raise ValueError("Template DB not loaded")
+
+        # templates are resized once here instead of once per character
+        self.names = list(templates.keys())
+        self.templates = [cv2.resize(t, (TARGET_W, TARGET_H), interpolation=cv2.INTER_AREA)
+                          for t in templates.values()]
+
+    def _score_one(self, char_img, top_k):
+        char_resized = cv2.resize(char_img, (TARGET_W, TARGET_H), interpolation=cv2.INTER_AREA)
+        scores = []
+        for char_name, template in zip(self.names, self.templates):
+            result = cv2.matchTemplate(char_resized, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, _ = cv2.minMaxLoc(result)
+            scores.append((char_name, float(max_val)))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:top_k]
+
+    def score(self, character_images, top_k=3):
+        if self.parallel and len(character_images) > 1:
+            import exec_config
+            return list(exec_config.thread_pool().map(self._score_one, character_images,
+                                                      [top_k] * len(character_images)))
+        return [self._score_one(char_img, top_k) for char_img in character_images]
+
+
+# --- Learned classifier --- #
+def extract_features(character_images):
+    """
+    vectorized features for a batch of characters: zoning densities, row and
+    column projections and a HOG-like histogram of gradient orientations.
+    Returns an (N, D) float32 array of unit-length, mean-centered vectors so
+    a dot product behaves like a correlation score
+    """
+    stack = np.stack([
+        cv2.resize(img, (TARGET_W, TARGET_H), interpolation=cv2.INTER_AREA) for img in character_images
+    ]).astype(np.float32) / 255.0
+    n = stack.shape[0]
+
+    # 8x8 zoning: mean ink per 10x5 pixel zone
+    zoning = stack.reshape(n, 8, TARGET_H // 8, 8, TARGET_W // 8).mean(axis=(2, 4)).reshape(n, -1)
+
+    # projections, 20 row bins and 10 column bins
+    rows = stack.mean(axis=2).reshape(n, 20, TARGET_H // 20).mean(axis=2)
+    cols = stack.mean(axis=1).reshape(n, 10, TARGET_W // 10).mean(axis=2)
+
+    # gradient orientation histograms on a 4x4 grid of cells, 9 unsigned bins
+    gy, gx = np.gradient(stack, axis=(1, 2))
+    magnitude = np.sqrt(gx * gx + gy * gy)
+    orientation = np.mod(np.arctan2(gy, gx), np.pi)
+    bins = np.minimum((orientation / np.pi * 9).astype(np.intp), 8)
+    hog = np.zeros((n, TARGET_H, TARGET_W, 9), dtype=np.float32)
+    np.put_along_axis(hog, bins[..., None], magnitude[..., None], axis=3)
+    hog = hog.reshape(n, 4, TARGET_H // 4, 4, TARGET_W // 4, 9).sum(axis=(2, 4)).reshape(n, -1)
+
+    blocks = []
+    for block in (zoning, rows, cols, hog):
+        norm = np.linalg.norm(block, axis=1, keepdims=True)
+        blocks.append(block / np.maximum(norm, 1e-6))
+    features = np.concatenate(blocks, axis=1)
+
+    features -= features.mean(axis=1, keepdims=True)
+    features /= np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-6)
+    return features.astype(np.float32)
+
+
+class FeatureRecognizer(Recognizer):
+    """
+    nearest-neighbour classifier over extract_features(), trained offline by
+    train_classifier.py. The score of a class is the best cosine similarity
+    to any of its training samples, computed for the whole plate at once
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Classifier model not found at {model_path}, run train_classifier.py first")
+
+        model = np.load(model_path)
+        features = model["features"].astype(np.float32)
+        labels = model["labels"]
+
+        # group the samples by class so per-class maxima are one reduceat
+        order = np.argsort(labels, kind="stable")
+        self.features = features[order]
+        labels = labels[order]
+        self.classes, self.starts = np.unique(labels, return_index=True)
+        self.min_score = float(model["min_score"]) if "min_score" in model else self.min_score
+
+    def score(self, character_images, top_k=3):
+        similarity = extract_features(character_images) @ self.features.T
+        class_scores = np.maximum.reduceat(similarity, self.starts, axis=1)
+
+        k = min(top_k, class_scores.shape[1])
+        top = np.argpartition(-class_scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(class_scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [[(str(self.classes[c]), float(s)) for c, s in zip(row, row_scores)]
+                for row, row_scores in zip(top, top_scores)]
+
+
+# --- Picking a recognizer --- #
+RECOGNIZERS = ("template", "classifier")
+
+_cache = {}
+
+def get_recognizer(name="template", template_directory="templates", model_path=DEFAULT_MODEL_PATH, parallel=False):
+    """
+    returns a cached recognizer, falls back to templates when the classifier
+    model is missing. parallel only matters for template matching, the
+    classifier already scores the whole plate in one pass
+    """
+    key = (name, os.path.abspath(template_directory), os.path.abspath(model_path), parallel)
+    if key in _cache:
+        return _cache[key]
+
+    recognizer = None
+    if name == "classifier":
+        try:
+            recognizer = FeatureRecognizer(model_path)
+        except Exception as e:
+            print(f"Error loading classifier, using template matching instead: {e}")
+    elif name != "template":
+        raise ValueError(f"Unknown recognizer: {name} (expected one of {RECOGNIZERS})")
+
+    if recognizer is None:
+        recognizer = TemplateRecognizer(template_directory=template_directory, parallel=parallel)
+
+    _cache[key] = recognizer
+    return recognizer
@@ -0,0 +1,212 @@
+import csv
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# --- Local registration registry --- #
+"""
+a local snapshot of registration records, filled by bulk import of exported
+records (csv or json lines with the same fields check_plate returns). It is
+the first-tier lookup before any network call and it can resolve plates with
+characters the recognizer was unsure of ("?"), e.g. "AB?1234".
+
+records live in SQLite so the snapshot survives restarts, lookups use an
+in-memory positional index: every plate is indexed by (length, position,
+two-character chunk) and a pattern is answered by intersecting the entries
+of its known characters, smallest entry first.
+"""
+
+FIELDS = ("plate_number", "mv_classification", "lto_nru_office", "released_to", "date_released")
+LABELS = ("Plate Number", "MV Classification", "LTO NRU Office", "Released To", "Date Released")
+
+DEFAULT_DB_PATH = os.environ.get(
+    "PLATE_REGISTRY_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry.db"),
+)
+
+
+def normalize_plate(plate):
+    """uppercase and without spaces or dashes, keeps "?" for unknown characters"""
+    return re.sub(r"[^A-Z0-9?]", "", str(plate).upper())
+
+
+class PlateRegistry:
+    """SQLite-backed registration records with a wildcard-capable in-memory index"""
+
+    # patterns with more unknown characters match too many plates to mean anything
+    max_unknown = 2
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS registry ({FIELDS[0]} TEXT PRIMARY KEY, "
+            + ", ".join(f"{field} TEXT" for field in FIELDS[1:]) + ")"
+        )
+        self._conn.commit()
+
+        self._records = {}  # plate -> data dict
+        self._chunks = {}   # (length, position, two chars) -> set of plates
+        self._singles = {}  # (length, position, char) -> set of plates
+        self._by_length = {}
+        for row in self._conn.execute(f"SELECT {', '.join(FIELDS)} FROM registry"):
+            self._index(dict(zip(FIELDS, row)))
+
+    def __len__(self):
+        return len(self._records)
+
+    # --- Indexing --- #
+    def _index(self, record):
+        plate = record["plate_number"]
+        if plate in self._records:
+            self._records[plate] = record  # same plate, positions do not change
+            return
+        self._records[plate] = record
+        length = len(plate)
+        self._by_length.setdefault(length, set()).add(plate)
+        for pos, char in enumerate(plate):
+            self._singles.setdefault((length, pos, char), set()).add(plate)
+            if pos + 1 < length:
+                self._chunks.setdefault((length, pos, plate[pos:pos + 2]), set()).add(plate)
+
+    # --- Bulk import --- #
+    def import_records(self, records):
+        """inserts or replaces records (dicts with the FIELDS keys) in one transaction, returns the count"""
+        rows = []
+        for record in records:
+            plate = normalize_plate(record.get("plate_number", ""))
+            if not plate or "?" in plate:
+                continue
+            clean = {field: str(record.get(field, "") or "").strip() for field in FIELDS}
+            clean["plate_number"] = plate
+            rows.append(clean)
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO registry ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                    [tuple(row[field] for field in FIELDS) for row in rows],
+                )
+            for row in rows:
+                self._index(row)
+        return len(rows)
+
+    def import_file(self, path):
+        """imports a .csv export (header row with the FIELDS names) or a .json / .jsonl export"""
+        if path.lower().endswith(".csv"):
+            with open(path, newline="", encoding="utf-8") as f:
+                return self.import_records(csv.DictReader(f))
+
+        with open(path, encoding="utf-8") as f:
+            if path.lower().endswith(".jsonl"):
+                return self.import_records(json.loads(line) for line in f if line.strip())
+            return self.import_records(json.load(f))
+
+    # --- Lookup --- #
+    def get(self, plate):
+        """exact lookup, returns the data dict or None"""
+        return self._records.get(normalize_plate(plate))
+
+    def _matching_plates(self, pattern):
+        length = len(pattern)
+        known = [pos for pos, char in enumerate(pattern) if char != "?"]
+        if not known:
+            return self._by_length.get(length, set())
+
+        entries = []
+        for pos in known:
+            if pos + 1 < length and pattern[pos + 1] != "?":
+                entries.append(self._chunks.get((length, pos, pattern[pos:pos + 2]), set()))
+            else:
+                entries.append(self._singles.get((length, pos, pattern[pos]), set()))
+
+        # intersect starting from the most selective entry, each step only walks the smaller set
+        entries.sort(key=len)
+        candidates = entries[0]
+        for entry in entries[1:]:
+            if not candidates:
+                break
+            candidates = candidates & entry
+        return candidates
+
+    def lookup(self, pattern, candidates=None, limit=10):
+        """
+        resolves a plate with "?" wildcards. candidates are the recognizer's
+        per-character [(char, score), ...] lists, matches are ranked by the
+        average score of their characters. Returns [(data dict, score), ...].
+        Patterns with more than max_unknown "?" are refused (no matches)
+        """
+        pattern = normalize_plate(pattern)
+        if not pattern or pattern.count("?") > self.max_unknown:
+            return []
+
+        with self._lock:
+            if "?" not in pattern:
+                record = self._records.get(pattern)
+                return [(record, 1.0)] if record else []
+            plates = list(self._matching_plates(pattern))
+
+        # score lookups per position, built once instead of once per plate
+        scores = None
+        if candidates and len(candidates) == len(pattern):
+            scores = [dict(char_candidates) for char_candidates in candidates]
+
+        def score(plate):
+            if scores is None:
+                return 0.0
+            return sum(position.get(char, 0.0) for char, position in zip(plate, scores)) / len(plate)
+
+        # partial selection, only the top matches are ordered
+        ranked = heapq.nsmallest(limit, ((-score(plate), plate) for plate in plates))
+        return [(self._records[plate], -negative) for negative, plate in ranked]
+
+    def close(self):
+        self._conn.close()
+
+
+# --- Shared registry --- #
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry(db_path=DEFAULT_DB_PATH):
+    """the process-wide registry, None when no snapshot has been imported yet"""
+    global _registry
+    with _registry_lock:
+        if _registry is None or _registry.db_path != db_path:
+            if not os.path.exists(db_path):
+                return None
+            _registry = PlateRegistry(db_path)
+        return _registry
+
+
+def to_results(data):
+    """human-readable lines in the same format check_plate returns"""
+    return [f"{label}: {data[field]}" for field, label in zip(FIELDS, LABELS) if data.get(field)]
+
+
+# --- For importing and querying from the terminal --- #
+if __name__ == "__main__":
+    # python registry.py import <export.csv|.json|.jsonl> [...]
+    # python registry.py lookup <plate, e.g. AB?1234>
+    if len(sys.argv) < 3 or sys.argv[1] not in ("import", "lookup"):
+        print("usage: python registry.py import <file> [...] | lookup <plate>")
+        sys.exit(1)
+
+    registry = PlateRegistry()
+    if sys.argv[1] == "import":
+        for path in sys.argv[2:]:
+            print(f"Imported {registry.import_file(path)} records from {path}")
+        print(f"Registry now holds {len(registry)} plates")
+    else:
+        start = time.perf_counter()
+        matches = registry.lookup(sys.argv[2])
+        elapsed = (time.perf_counter() - start) * 1000
+        for data, score in matches:
+            print(f"{data['plate_number']}  ({score:.2f})  {data['released_to']}")
+        print(f"{len(matches)} match(es) in {elapsed:.3f} ms")
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+# --- Fixed-camera region of interest prior --- #
+"""
+gate cameras are bolted in place so plates land in roughly the same part of
+every frame. A CameraProfile keeps a decaying heat map of where past plate
+quads were found and turns it into a region of interest, plate_detect then
+runs the contour search on that region first (at full quality) and only
+falls back to the whole-frame pyramid when the region misses.
+
+profiles are saved per camera with save() / load_profile() so the prior
+survives restarts and keeps updating as new detections come in
+"""
+
+GRID_W = 64
+GRID_H = 36
+
+
+class CameraProfile:
+    """learned heat map of plate positions for one fixed camera"""
+
+    def __init__(self, camera_id="default", decay=0.995, min_samples=5, threshold=0.05, margin=0.5):
+        self.camera_id = camera_id
+        self.decay = decay              # older detections fade so the prior follows a moved camera
+        self.min_samples = min_samples  # detections needed before the ROI is trusted
+        self.threshold = threshold      # heat (relative to the peak) that counts as "plates were here"
+        self.margin = margin            # extra border, as a fraction of the average plate size
+        self.heat = np.zeros((GRID_H, GRID_W), dtype=np.float32)
+        self.samples = 0
+        self.hits = 0
+        self.misses = 0
+        self._plate_size = np.zeros(2, dtype=np.float32)  # running average plate (w, h), normalized
+        self._roi = None
+
+    # --- Learning --- #
+    def update(self, plate_contour, frame_shape):
+        """adds a detected plate quad (frame coordinates) to the heat map"""
+        h, w = frame_shape[:2]
+        pts = plate_contour.reshape(-1, 2).astype(np.float32)
+        x0, y0 = pts.min(axis=0) / (w, h)
+        x1, y1 = pts.max(axis=0) / (w, h)
+
+        gx0, gx1 = int(np.clip(x0 * GRID_W, 0, GRID_W - 1)), int(np.clip(np.ceil(x1 * GRID_W), 1, GRID_W))
+        gy0, gy1 = int(np.clip(y0 * GRID_H, 0, GRID_H - 1)), int(np.clip(np.ceil(y1 * GRID_H), 1, GRID_H))
+
+        self.heat *= self.decay
+        self.heat[gy0:gy1, gx0:gx1] += 1.0
+
+        size = np.array([x1 - x0, y1 - y0], dtype=np.float32)
+        self.samples += 1
+        self._plate_size += (size - self._plate_size) / min(self.samples, 50)
+        self._roi = None
+
+    def record(self, found_in_roi):
+        """keeps count of how often the ROI alone was enough"""
+        if found_in_roi:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # --- Using the prior --- #
+    def roi_normalized(self):
+        """(x0, y0, x1, y1) in 0..1 frame coordinates, or None while the prior is not trained"""
+        if self.samples < self.min_samples or not self.heat.any():
+            return None
+        if self._roi is None:
+            ys, xs = np.nonzero(self.heat >= self.heat.max() * self.threshold)
+            x0, x1 = xs.min() / GRID_W, (xs.max() + 1) / GRID_W
+            y0, y1 = ys.min() / GRID_H, (ys.max() + 1) / GRID_H
+            mx, my = self._plate_size * self.margin
+            self._roi = (max(0.0, x0 - mx), max(0.0, y0 - my), min(1.0, x1 + mx), min(1.0, y1 + my))
+        return self._roi
+
+    def roi(self, frame_shape):
+        """(x, y, w, h) in pixels for a frame of this shape, or None to search the whole frame"""
+        roi = self.roi_normalized()
+        if roi is None:
+            return None
+        h, w = frame_shape[:2]
+        x0, y0 = int(roi[0] * w), int(roi[1] * h)
+        x1, y1 = int(np.ceil(roi[2] * w)), int(np.ceil(roi[3] * h))
+        if (x1 - x0) * (y1 - y0) >= w * h:
+            return None  # ROI covers everything, nothing to gain
+        return x0, y0, x1 - x0, y1 - y0
+
+    def roi_fraction(self):
+        """area of the ROI relative to the frame, roughly the detection cost compared to a full search"""
+        roi = self.roi_normalized()
+        if roi is None:
+            return 1.0
+        return (roi[2] - roi[0]) * (roi[3] - roi[1])
+
+    # --- Saving and loading --- #
+    def save(self, path):
+        """writes the profile to an .npz file"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, heat=self.heat, samples=self.samples, hits=self.hits, misses=self.misses,
+                 plate_size=self._plate_size, camera_id=self.camera_id)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """reads a profile saved with save()"""
+        data = np.load(path)
+        profile = cls(str(data["camera_id"]), **kwargs)
+        profile.heat = data["heat"].astype(np.float32)
+        profile.samples = int(data["samples"])
+        profile.hits = int(data["hits"])
+        profile.misses = int(data["misses"])
+        profile._plate_size = data["plate_size"].astype(np.float32)
+        return profile
+
+
+def load_profile(camera_id, directory="camera_profiles"):
+    """loads the saved profile of a camera, or starts a fresh one"""
+    path = os.path.join(directory, f"{camera_id}.npz")
+    if os.path.exists(path):
+        try:
+            return CameraProfile.load(path)
+        except Exception as e:
+            print(f"Error loading camera profile {path}, starting a new one: {e}")
+    return CameraProfile(camera_id)
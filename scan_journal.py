@@ -0,0 +1,188 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# --- Scan journal --- #
+"""
+append-only history of every scan: image, recognized text, per-character
+scores, registration status and details, and timings.
+
+record() only puts the scan on a queue, a background writer thread commits
+the queued scans to SQLite in batched transactions (up to batch_size scans
+or every flush_interval seconds), so peak traffic never waits on a
+synchronous write per scan. The table is indexed by plate and by timestamp
+and query() pages through it newest first.
+"""
+
+DEFAULT_DB_PATH = os.environ.get(
+    "PLATE_JOURNAL_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scan_journal.db"),
+)
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS scans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts REAL NOT NULL,
+        image_path TEXT,
+        plate TEXT,
+        char_scores TEXT,
+        status TEXT,
+        details TEXT,
+        timings TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_scans_plate ON scans (plate, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_scans_ts ON scans (ts)",
+)
+
+COLUMNS = ("id", "ts", "image_path", "plate", "char_scores", "status", "details", "timings")
+JSON_COLUMNS = ("char_scores", "details", "timings")
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    # WAL lets the GUI read the history while the writer commits
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ScanJournal:
+    """batched background writer plus an indexed query API"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, batch_size=100, flush_interval=1.0, max_queue=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        self._read_lock = threading.Lock()
+        self._reader = _connect(db_path)
+        with self._reader:
+            for statement in SCHEMA:
+                self._reader.execute(statement)
+
+        self._thread = threading.Thread(target=self._run, name="scan-journal", daemon=True)
+        self._thread.start()
+
+    # --- Writing --- #
+    def record(self, image_path, plate, char_scores=None, status="", details=None, timings=None, ts=None):
+        """queues one scan, returns right away (only blocks if the writer is max_queue scans behind)"""
+        row = (
+            ts if ts is not None else time.time(),
+            image_path or "",
+            plate or "",
+            json.dumps(char_scores or []),
+            status or "",
+            json.dumps(details or {}),
+            json.dumps(timings or {}),
+        )
+        self.queue.put(row)
+
+    def _run(self):
+        conn = _connect(self.db_path)
+        stopping = False
+        while not stopping:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [row for row in batch if row is not None]
+            stopping = len(rows) != len(batch)
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO scans (ts, image_path, plate, char_scores, status, details, timings) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            except Exception as e:
+                print(f"Error writing scan journal: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        conn.close()
+
+    def flush(self):
+        """waits until every queued scan is committed"""
+        self.queue.join()
+
+    def close(self):
+        """commits what is queued and stops the writer"""
+        self.queue.put(None)
+        self._thread.join()
+        self._reader.close()
+
+    # --- Querying --- #
+    def query(self, plate=None, since=None, until=None, before=None, limit=50):
+        """
+        scans newest first. plate matches as a prefix (uses the plate index),
+        since / until are unix timestamps, before is the (ts, id) of the last
+        scan of the previous page (keyset paging, no OFFSET scans). Pages are
+        ordered by (ts, id), which idx_scans_ts returns in order, so a page
+        reads only its own rows. A plate prefix is narrow enough that sorting
+        its rows beats walking the whole ts index for them
+        """
+        where, params = [], []
+        if plate:
+            plate = plate.strip().upper()
+            where.append("plate >= ? AND plate < ?")
+            params += [plate, plate + "\U0010ffff"]
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        if before is not None:
+            where.append("(ts, id) < (?, ?)")
+            params += list(before)
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM scans"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+
+        scans = []
+        for row in rows:
+            scan = dict(zip(COLUMNS, row))
+            for column in JSON_COLUMNS:
+                try:
+                    scan[column] = json.loads(scan[column]) if scan[column] else None
+                except ValueError:
+                    pass
+            scans.append(scan)
+        return scans
+
+    def count(self):
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+
+# --- Shared journal --- #
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal(db_path=DEFAULT_DB_PATH):
+    """the process-wide journal, created on first use"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = ScanJournal(db_path)
+            # commit whatever is still queued when the app exits
+            atexit.register(_journal.close)
+        return _journal
@@ -1,9 +1,15 @@
-import sys
+import sys, os
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 from main_app import MainWindow
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+
+    # used by benchmarks/bench_startup.py, reports once the first window is up and exits
+    if os.environ.get("PLATE_STARTUP_PROBE"):
+        QTimer.singleShot(0, lambda: (print("window-shown", flush=True), app.quit()))
+
     sys.exit(app.exec())
\ No newline at end of file
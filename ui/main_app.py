@@ -6,9 +6,24 @@ from PyQt6.QtCore import Qt, QTimer
 # add files
 from sections.home import Home
 from sections.results import Results
+from sections.history import History
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-import plate_detect
-import checkPlate
+import threading
+import exec_config
+import metrics
+import scan_journal
+
+# plate_detect (OpenCV) and checkPlate (Selenium) are heavy, they are imported
+# when first needed so the window shows up right away
+def preload_backends():
+    """imports the recognition and lookup modules so the first scan does not wait for them"""
+    try:
+        import plate_detect
+        import checkPlate
+        import selenium.webdriver
+        exec_config.apply()
+    except Exception as e:
+        print(f"Error preloading backends: {e}")
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -16,8 +31,19 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("License Plate Checker - Group 4")
         self.setMinimumSize(1200, 800)
         self.setStyleSheet( "background-color: #ECEFF1; color: black;")
+        # the GUI handles one image at a time: the latency profile spreads it over a
+        # small thread pool and splits the cores between the pool and OpenCV
+        # (see exec_config.pool_threads), PLATE_EXEC_PROFILE / PLATE_CV_THREADS override it
+        exec_config.configure(os.environ.get("PLATE_EXEC_PROFILE", "latency"))
+        # PLATE_METRICS_PORT / PLATE_METRICS_FILE export the runtime metrics
+        metrics.start_from_env()
         self.setup_menu_bar()
         self.setup_ui()
+
+        # warm up the heavy imports in the background once the event loop is running
+        # set PLATE_NO_PRELOAD=1 to keep everything lazy (e.g. when measuring startup)
+        if not os.environ.get("PLATE_NO_PRELOAD"):
+            QTimer.singleShot(0, lambda: threading.Thread(target=preload_backends, daemon=True).start())
     
     def setup_menu_bar(self):
         menubar = self.menuBar()
@@ -33,7 +59,13 @@ class MainWindow(QMainWindow):
         exit_action.setStatusTip("Exit application")
         exit_action.triggered.connect(self.close)
         
+        history_action = QAction("History", self)
+        history_action.setShortcut("Ctrl+H")
+        history_action.setStatusTip("Show scan history")
+        history_action.triggered.connect(self.toggle_history)
+        
         options_menu.addAction(reset_action)
+        options_menu.addAction(history_action)
         options_menu.addAction(exit_action)
     
     def setup_ui(self):
@@ -53,9 +85,13 @@ class MainWindow(QMainWindow):
         self.results = Results()
         self.results.hide()
 
+        self.history = History()
+        self.history.hide()
+
         # add sections to layout
         layout.addWidget(self.home)
         layout.addWidget(self.results)
+        layout.addWidget(self.history)
 
         # connect proceed button
         try:
@@ -77,29 +113,57 @@ class MainWindow(QMainWindow):
         status_text = "Unknown"
         status_color = "background-color: #f5f5f5;"
         plate_details = None
+        possible_matches = None
+        recognition = None
+        lookup = None
         
         if image_path:
             try:
+                import plate_detect
+                import checkPlate
+                exec_config.apply()
+
                 template_dir = os.path.join(
                     os.path.dirname(os.path.dirname(__file__)), 
                     "templates"
                 )
                 # Run plate detection function
-                recognized_text = plate_detect.recognize_license_plate(
+                recognition = plate_detect.read_license_plate(
                     image_path, 
-                    template_directory=template_dir
+                    template_directory=template_dir,
+                    parallel=exec_config.get_config().parallel
                 )
+                recognized_text = recognition["text"]
                 # Check recognition
-                if recognized_text and not recognized_text.startswith("License plate") and not recognized_text.startswith("Failed") and not recognized_text.startswith("No characters"):
+                if recognized_text and not recognition["error"]:
                     plate_text = recognized_text
-                    # Check plate registration from LTO website
+                    # Check plate registration, local registry first then the LTO website
                     try:
                         print(f"Checking plate registration for: {plate_text}")
-                        results, plate_details = checkPlate.check_plate(plate_text)
+                        lookup = checkPlate.lookup_plate(plate_text, recognition["candidates"])
+                        plate_details = lookup["data"]
+                        # registry plates that fit a read with unknown characters, for the operator to check
+                        if "?" in plate_text and lookup["matches"]:
+                            possible_matches = lookup["matches"]
                         # Verify if plate is actually registered
-                        if plate_details and any(plate_details.values()):
+                        if lookup["status"] == "registered":
+                            # the registry may have filled in unreadable characters
+                            plate_text = plate_details.get("plate_number") or plate_text
                             status_text = "Registered"
                             status_color = "background-color: #66BB6A;" # Green
+                        elif lookup["status"] == "registered_inferred":
+                            # the unknown characters were guessed, keep the plate as read
+                            status_text = "Possible Match (Unverified)"
+                            status_color = "background-color: #FFCA28;" # Yellow/Orange
+                            plate_details = None
+                        elif lookup["status"] == "unavailable":
+                            status_text = "Detected (Verification Unavailable)"
+                            status_color = "background-color: #FFCA28;" # Yellow/Orange
+                            plate_details = None
+                        elif lookup["status"] == "unresolved":
+                            status_text = "Detected (Incomplete Plate)"
+                            status_color = "background-color: #FFCA28;" # Yellow/Orange
+                            plate_details = None
                         else:
                             status_text = "Not Registered"
                             status_color = "background-color: #FFCA28;" # Yellow/Orange
@@ -120,8 +184,26 @@ class MainWindow(QMainWindow):
                 status_text = "Failed"
                 status_color = "background-color: #EF5350;" # Red
 
+        # journal every scan, record() only queues it for the background writer
+        if image_path:
+            try:
+                timings = dict(recognition["timings"]) if recognition else {}
+                if lookup:
+                    timings["lookup"] = lookup["seconds"]
+                scan_journal.get_journal().record(
+                    image_path,
+                    plate_text,
+                    recognition["candidates"] if recognition else None,
+                    status_text,
+                    plate_details,
+                    timings,
+                )
+            except Exception as e:
+                print(f"Error recording scan: {e}")
+
         try:
-            self.results.set_results(image_path or "", plate_text, status_text, status_color, plate_details)
+            self.results.set_results(image_path or "", plate_text, status_text, status_color, plate_details,
+                                     possible_matches)
             self.results.show()
             # Scroll down to results
             QTimer.singleShot(100, lambda: self._scroll_area.verticalScrollBar().setValue(
@@ -137,8 +219,25 @@ class MainWindow(QMainWindow):
             self.home.on_clear()
             # Hide results section
             self.results.hide()
+            self.history.hide()
             # Scroll up to top
             QTimer.singleShot(100, lambda: self._scroll_area.verticalScrollBar().setValue(0))
             
         except Exception as e:
-            print(f"Error during reset: {e}")
\ No newline at end of file
+            print(f"Error during reset: {e}")
+
+    def toggle_history(self):
+        """Show or hide the scan history"""
+        try:
+            if self.history.isVisible():
+                self.history.hide()
+                return
+            self.history.set_journal(scan_journal.get_journal())
+            self.history.refresh()
+            self.history.show()
+            # Scroll down to history
+            QTimer.singleShot(100, lambda: self._scroll_area.verticalScrollBar().setValue(
+                self._scroll_area.verticalScrollBar().maximum()
+            ))
+        except Exception as e:
+            print(f"Error showing history: {e}")
@@ -0,0 +1,130 @@
+import sys
+from datetime import datetime
+from PyQt6.QtGui import *
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import Qt
+
+class History(QWidget):
+    # rows fetched per page, the next page loads when the table is scrolled to the bottom
+    PAGE_SIZE = 50
+
+    def __init__(self):
+        super().__init__()
+        self.journal = None
+        self.last_key = None  # (ts, id) of the last row shown, where the next page starts
+        self.has_more = False
+        self.history_ui()
+
+    def history_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(40, 20, 40, 20)
+
+        # title
+        title = QLabel("Scan History")
+        title.setStyleSheet("font-weight: 800; font-size: 36px;")
+        layout.addWidget(title, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        # search row
+        search_row = QHBoxLayout()
+        search_row.setContentsMargins(0, 8, 0, 8)
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search plate number (prefix)")
+        self.search_box.setStyleSheet(
+            "font-size: 16px; padding: 8px; border-radius: 8px; background: #FAFAFA;"
+        )
+        self.search_box.returnPressed.connect(self.refresh)
+
+        self.search_btn = QPushButton("Search")
+        self.search_btn.setMinimumSize(120, 40)
+        self.search_btn.setStyleSheet(
+            """
+                QPushButton {
+                    padding: 8px 18px;
+                    font-size: 16px;
+                    font-weight: bold;
+                    border-radius: 8px;
+                    color: white;
+                    background-color: #42A5F5;
+                }
+                QPushButton:hover {
+                    background-color: #1E88E5;
+                }
+            """
+        )
+        self.search_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.search_btn.clicked.connect(self.refresh)
+
+        search_row.addWidget(self.search_box)
+        search_row.addWidget(self.search_btn)
+        layout.addLayout(search_row)
+
+        # history table
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Time", "Plate", "Status", "Image", "Total (ms)"])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.setMinimumHeight(500)
+        self.table.setStyleSheet("font-size: 14px; background: #FAFAFA; border-radius: 12px;")
+        self.table.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        layout.addWidget(self.table)
+
+        self.count_label = QLabel("")
+        self.count_label.setStyleSheet("font-size: 14px; color: #333333;")
+        layout.addWidget(self.count_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+    def set_journal(self, journal):
+        self.journal = journal
+
+    def refresh(self):
+        """reloads the first page with the current search"""
+        # reset before clearing, and keep the scrollbar quiet while the rows go:
+        # its maximum dropping to 0 would make on_scroll load a page of the old search
+        self.last_key = None
+        self.has_more = True
+        scroll_bar = self.table.verticalScrollBar()
+        scroll_bar.blockSignals(True)
+        try:
+            self.table.setRowCount(0)
+        finally:
+            scroll_bar.blockSignals(False)
+        self.load_page()
+
+    def load_page(self):
+        if self.journal is None or not self.has_more:
+            return
+        try:
+            scans = self.journal.query(
+                plate=self.search_box.text() or None,
+                before=self.last_key,
+                limit=self.PAGE_SIZE,
+            )
+        except Exception as e:
+            print(f"Error loading scan history: {e}")
+            return
+
+        self.has_more = len(scans) == self.PAGE_SIZE
+        for scan in scans:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            timings = scan.get("timings") or {}
+            total_ms = sum(v for v in timings.values() if isinstance(v, (int, float))) * 1000
+            values = [
+                datetime.fromtimestamp(scan["ts"]).strftime("%Y-%m-%d %H:%M:%S"),
+                scan["plate"],
+                scan["status"],
+                scan["image_path"],
+                f"{total_ms:.0f}",
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(str(value)))
+            self.last_key = (scan["ts"], scan["id"])
+
+        more = " (scroll for more)" if self.has_more else ""
+        self.count_label.setText(f"Showing {self.table.rowCount()} scans{more}")
+
+    def on_scroll(self, value: int):
+        # lazy paging, fetch the next page once the bottom is reached
+        if value == self.table.verticalScrollBar().maximum():
+            self.load_page()
@@ -87,6 +87,14 @@ class Results(QWidget):
 
         layout.addLayout(info_row)
 
+        # registry plates matching a read with unknown characters
+        self.matches_label = QLabel("")
+        self.matches_label.setWordWrap(True)
+        self.matches_label.setContentsMargins(20, 12, 20, 12)
+        self.matches_label.setStyleSheet("font-size: 18px; background: #f5f5f5; border-radius: 12px;")
+        self.matches_label.hide()
+        layout.addWidget(self.matches_label)
+
         # plate details section
         self.details_container = QWidget()
         self.details_container.setStyleSheet("background: #f5f5f5; border-radius: 12px;")
@@ -151,7 +159,8 @@ class Results(QWidget):
         
         return value_label
 
-    def set_results(self, image_path: str, plate_text: str, status_text: str, status_color: str, plate_details: dict = None):
+    def set_results(self, image_path: str, plate_text: str, status_text: str, status_color: str, plate_details: dict = None,
+                    possible_matches: list = None):
         # set image
         try:
             pix = QPixmap(image_path)
@@ -168,6 +177,13 @@ class Results(QWidget):
         self.status_text.setText(status_text)
         self.status_box.setStyleSheet(self.status_box_styling + status_color)
 
+        # show which registry plates fit the unreadable characters
+        if possible_matches:
+            self.matches_label.setText("Possible matches: " + ", ".join(possible_matches))
+            self.matches_label.show()
+        else:
+            self.matches_label.hide()
+
         # display plate details if provided and registered
         if plate_details and status_text == "Registered":
             self.mv_classification_label.setText(plate_details.get('mv_classification', 'N/A'))